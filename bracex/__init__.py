@@ -19,13 +19,36 @@ CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFT
 IN THE SOFTWARE.
 """
 from __future__ import annotations
-import itertools
+import asyncio
+import functools
 import math
+import operator
+import os
 import re
-from typing import Iterator, Pattern, Match, Iterable, AnyStr, Any
+import sys
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, FIRST_COMPLETED, wait  # noqa: F401
+from typing import Iterable, Iterator, AsyncIterator, Pattern, Match, AnyStr, Any, Generic, NamedTuple
 from . import __meta__
-
-__all__ = ('expand', 'iexpand')
+from ._nodes import (  # noqa: F401
+    Sentinel, EMPTY, EMPTY_BYTES, Node, Literal, InvalidBrace, Sequence, Alternation, IntRange, CharRange,
+    MAX_CACHED, make_sequence, make_alternation, collect as _collect, seek as _seek, rank as _rank, size as _size,
+    lengths as _lengths, depth as _depth, walk as _walk, encode as _encode
+)
+from ._regex import to_regex as _to_regex
+from ._compress import compress as _compress
+from . import _unique
+from ._sort import sorted_values as _sorted_values
+
+__all__ = (
+    'Alternation', 'BracePattern', 'CancellationToken', 'CharRange', 'IntRange', 'InvalidBrace', 'Literal', 'Node',
+    'Sequence', 'aiexpand', 'cache_info', 'compile', 'compress', 'count', 'expand', 'expand_many', 'expand_parallel',
+    'iexpand', 'iexpand_chunks', 'iexpand_many', 'index_of', 'match', 'nth', 'parse', 'purge', 'set_cache_size', 'size',
+    'stats', 'to_regex', 'unique_strategy'
+)
 
 __version__ = __meta__.__version__
 __version_info__ = __meta__.__version_info__
@@ -34,9 +57,18 @@ _alpha = [chr(x) if x != 0x5c else '' for x in range(ord('A'), ord('z') + 1)]
 _nalpha = list(reversed(_alpha))
 
 RE_INT_ITER = re.compile(r'(-?((?:0(?=\d))*)\d+)\.{2}(-?((?:0(?=\d))*)\d+)(?:\.{2}-?(((?:0(?=\d))*)\d+))?(?=\})')
+RE_LITERAL = re.compile(r'[^{},\\$]+')
+RE_OPTIONS = re.compile(r'([^{},\\$]*(?:,[^{},\\$]*)+)\}')
 RE_CHR_ITER = re.compile(r'([A-Za-z])\.{2}([A-Za-z])(?:\.{2}-?(((?:0(?=\d))*)\d+))?(?=\})')
 
 DEFAULT_LIMIT = 1000
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CHUNKSIZE = 100000
+DEFAULT_BATCHSIZE = 1000
+DEFAULT_ASYNC_BATCH = 1000
+
+# How many expansions are generated between checks for cancellation.
+CANCEL_INTERVAL = 1000
 
 MAX_NEG_INT_64 = -2 ** 63
 MAX_INT_64 = abs(MAX_NEG_INT_64 + 1)
@@ -51,42 +83,1023 @@ def int64(string: str) -> int:
     return integer
 
 
-class Sentinel(str):
-    """A sentinel string value."""
+class ExpansionLimitException(Exception):
+    """Brace expansion limit exception."""
 
 
-EMPTY = Sentinel('')
+class ExpansionCancelledException(Exception):
+    """Brace expansion cancelled exception."""
 
+    def __init__(self, message: str, produced: int) -> None:
+        """Initialize with the number of expansions produced before the expansion was cancelled."""
 
-class ExpansionLimitException(Exception):
-    """Brace expansion limit exception."""
+        super().__init__(message)
+        self.produced = produced
+
+
+class ExpansionTimeoutException(ExpansionCancelledException):
+    """Brace expansion timeout exception."""
+
+
+class CancellationToken:
+    """
+    A token that cancels the expansions it is given to.
+
+    The token is cancelled when `cancel()` is called, from any thread, when the optional `timeout` (in seconds)
+    has passed since the token was created, or when the optional `parent` token is cancelled.
+    """
+
+    def __init__(self, timeout: float | None = None, parent: CancellationToken | None = None) -> None:
+        """Initialize."""
+
+        self._event = threading.Event()
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.parent = parent
+
+    def cancel(self) -> None:
+        """Cancel the expansions given the token."""
+
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token is cancelled."""
+
+        try:
+            self.check()
+        except ExpansionCancelledException:
+            return True
+        return False
+
+    def check(self, produced: int = 0) -> None:
+        """Raise an exception if the token is cancelled, reporting the number of expansions produced so far."""
+
+        if self.parent is not None:
+            self.parent.check(produced)
+        if self._event.is_set():
+            raise ExpansionCancelledException(f'Brace expansion was cancelled after {produced:d} expansions', produced)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise ExpansionTimeoutException(f'Brace expansion timed out after {produced:d} expansions', produced)
+
+
+class CacheInfo(NamedTuple):
+    """Pattern cache statistics."""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class Stats(NamedTuple):
+    """Pattern statistics."""
+
+    expansions: int
+    size: int
+    min_length: int
+    max_length: int
+    mean_length: float
+    depth: int
+    groups: int
+    largest_range: int
+
+
+class PatternCache:
+    """A thread safe, bounded LRU cache of compiled patterns."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        """Initialize."""
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # type: OrderedDict[tuple[Any, ...], BracePattern[Any]]
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(
+        self,
+        string: AnyStr,
+        keep_escapes: bool,
+        limit: int,
+        return_empty: bool,
+        cancel: CancellationToken | None = None
+    ) -> BracePattern[AnyStr]:
+        """Get a compiled pattern, compiling and storing it if it is not cached."""
+
+        key = (type(string), string, keep_escapes, limit, return_empty)
+        with self._lock:
+            pattern = self._cache.get(key)
+            if pattern is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return pattern
+            self._misses += 1
+
+        # Parse outside the lock so other threads are not held up by a large pattern.
+        pattern = BracePattern(string, keep_escapes, limit, return_empty, cancel)
+
+        if self._maxsize > 0:
+            with self._lock:
+                self._cache[key] = pattern
+                self._cache.move_to_end(key)
+                self._trim()
+        return pattern
+
+    def _trim(self) -> None:
+        """Evict the least recently used patterns until the cache fits within its size."""
+
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+            self._evictions += 1
+
+    def resize(self, maxsize: int) -> None:
+        """Set the maximum number of cached patterns."""
+
+        with self._lock:
+            self._maxsize = max(0, maxsize)
+            self._trim()
+
+    def clear(self) -> None:
+        """Clear cached patterns and statistics."""
+
+        with self._lock:
+            self._cache.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        """Get cache statistics."""
+
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._maxsize, len(self._cache))
+
+
+_cache = PatternCache()
+
+
+def compile(  # noqa: A001
+    string: AnyStr,
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    max_bytes: int = 0,
+    cancel: CancellationToken | None = None
+) -> BracePattern[AnyStr]:
+    """Parse braces into a reusable pattern."""
+
+    pattern = _cache.get(string, keep_escapes, limit, return_empty, cancel)
+    if max_bytes > 0:
+        total = pattern.size()
+        if total > max_bytes:
+            raise ExpansionLimitException(
+                f'Brace expansion of {total:d} characters has exceeded the limit of {max_bytes:d}'
+            )
+    return pattern
+
+
+def purge() -> None:
+    """Purge the pattern cache."""
+
+    _cache.clear()
+
+
+def cache_info() -> CacheInfo:
+    """Get pattern cache statistics."""
+
+    return _cache.info()
+
+
+def set_cache_size(maxsize: int) -> None:
+    """Set the maximum number of patterns held in the cache (`0` disables caching)."""
+
+    _cache.resize(maxsize)
 
 
 def expand(
     string: AnyStr,
     keep_escapes: bool = False,
     limit: int = DEFAULT_LIMIT,
-    return_empty: bool = False
+    return_empty: bool = False,
+    start: int | None = None,
+    stop: int | None = None,
+    shard: tuple[int, int] | None = None,
+    unique: bool | int = False,
+    sort: bool = False,
+    max_bytes: int = 0,
+    timeout: float | None = None,
+    cancel: CancellationToken | None = None
 ) -> list[AnyStr]:
     """Expand braces."""
 
-    return list(iexpand(string, keep_escapes, limit, return_empty))
+    if timeout is not None:
+        cancel = CancellationToken(timeout, cancel)
+    pattern = compile(string, keep_escapes, limit, return_empty, max_bytes, cancel)
+    return pattern.expand(start, stop, shard, unique, sort, cancel=cancel)
 
 
 def iexpand(
     string: AnyStr,
     keep_escapes: bool = False,
     limit: int = DEFAULT_LIMIT,
-    return_empty: bool = False
+    return_empty: bool = False,
+    start: int | None = None,
+    stop: int | None = None,
+    shard: tuple[int, int] | None = None,
+    unique: bool | int = False,
+    sort: bool = False,
+    max_bytes: int = 0,
+    timeout: float | None = None,
+    cancel: CancellationToken | None = None
 ) -> Iterator[AnyStr]:
     """Expand braces and return an iterator."""
 
+    if timeout is not None:
+        cancel = CancellationToken(timeout, cancel)
+    pattern = compile(string, keep_escapes, limit, return_empty, max_bytes, cancel)
+    yield from pattern.iexpand(start, stop, shard, unique, sort, cancel=cancel)
+
+
+def iexpand_chunks(
+    string: AnyStr,
+    size: int = DEFAULT_BATCHSIZE,
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    start: int | None = None,
+    stop: int | None = None,
+    shard: tuple[int, int] | None = None,
+    unique: bool | int = False,
+    sort: bool = False,
+    max_bytes: int = 0,
+    timeout: float | None = None,
+    cancel: CancellationToken | None = None
+) -> Iterator[list[AnyStr]]:
+    """Expand braces and return an iterator of lists of `size` expansions."""
+
+    if timeout is not None:
+        cancel = CancellationToken(timeout, cancel)
+    yield from compile(string, keep_escapes, limit, return_empty, max_bytes, cancel).iexpand_chunks(
+        size, start, stop, shard, unique, sort, cancel=cancel
+    )
+
+
+async def aiexpand(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    start: int | None = None,
+    stop: int | None = None,
+    shard: tuple[int, int] | None = None,
+    unique: bool | int = False,
+    sort: bool = False,
+    max_bytes: int = 0,
+    timeout: float | None = None,
+    cancel: CancellationToken | None = None,
+    batch: int = DEFAULT_ASYNC_BATCH,
+    time_slice: float | None = None,
+    executor: Executor | None = None
+) -> AsyncIterator[AnyStr]:
+    """
+    Expand braces and return an asynchronous iterator.
+
+    Control is given back to the event loop after every `batch` expansions, and if `time_slice` is given, whenever
+    that many seconds have passed since control was last given back. If `executor` is given, the pattern is parsed
+    and each batch is expanded in the executor instead of the event loop. As the expansions are handed between
+    threads, the executor must be a thread pool.
+    """
+
+    if batch < 1:
+        raise ValueError(f'The batch size must be greater than 0, not {batch:d}')
+
+    loop = asyncio.get_running_loop()
+    if timeout is not None:
+        cancel = CancellationToken(timeout, cancel)
+
+    get = functools.partial(compile, string, keep_escapes, limit, return_empty, max_bytes, cancel)
+    pattern = get() if executor is None else await loop.run_in_executor(executor, get)
+    chunks = pattern.iexpand_chunks(batch, start, stop, shard, unique, sort, cancel=cancel)
+    take = functools.partial(next, chunks, None)
+
+    while True:
+        chunk = take() if executor is None else await loop.run_in_executor(executor, take)
+        if chunk is None:
+            return
+
+        last = time.monotonic()
+        for value in chunk:
+            yield value
+            if time_slice is not None and time.monotonic() - last >= time_slice:
+                await asyncio.sleep(0)
+                last = time.monotonic()
+        await asyncio.sleep(0)
+
+
+def _expand_span(string: AnyStr, keep_escapes: bool, return_empty: bool, start: int, stop: int) -> list[AnyStr]:
+    """Expand a slice of the expansions in a worker process."""
+
+    return compile(string, keep_escapes, 0, return_empty).expand(start, stop)
+
+
+def expand_parallel(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    workers: int | None = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    ordered: bool = True
+) -> Iterator[AnyStr]:
+    """Expand braces across a pool of processes and return an iterator."""
+
+    if chunksize < 1:
+        raise ValueError(f'Chunk size must be a positive integer, not {chunksize:d}')
+
+    pattern = compile(string, keep_escapes, limit, return_empty)
+    total = pattern.count()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or total <= chunksize:
+        yield from pattern.iexpand()
+        return
+
+    # Only a couple of chunks per worker are in flight at a time so results do not pile up in memory.
+    executor = ProcessPoolExecutor(workers)
+    pending = deque()  # type: deque[Future[list[AnyStr]]]
+    try:
+        for start in range(0, total, chunksize):
+            pending.append(
+                executor.submit(_expand_span, string, keep_escapes, return_empty, start, min(start + chunksize, total))
+            )
+            if len(pending) < workers * 2:
+                continue
+            if ordered:
+                yield from pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield from future.result()
+
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _expand_batch(strings: list[AnyStr], keep_escapes: bool, limit: int, return_empty: bool) -> list[list[AnyStr]]:
+    """Expand a batch of patterns with a single expander."""
+
+    engine = ExpandBrace(keep_escapes, limit, return_empty)
+    results = []  # type: list[list[Any]]
+    for string in strings:
+        if isinstance(string, bytes):
+            node = _encode(engine.parse(string.decode('latin-1')))
+            values = [x for x in node if x is not EMPTY_BYTES]  # type: list[Any]
+            if not values and return_empty:
+                values.append(b'')
+            results.append(values)
+        else:
+            results.append(list(engine.expand(string)))
+    return results
+
+
+def expand_many(
+    strings: Iterable[AnyStr],
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    executor: Executor | None = None,
+    batchsize: int = DEFAULT_BATCHSIZE
+) -> dict[AnyStr, list[AnyStr]]:
+    """Expand many braces, returning the expansions keyed by pattern."""
+
+    # The expansions are all kept, so repeated patterns are dropped up front and each is only expanded once.
+    return dict(iexpand_many(dict.fromkeys(strings), keep_escapes, limit, return_empty, executor, batchsize))
+
+
+def iexpand_many(
+    strings: Iterable[AnyStr],
+    keep_escapes: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    return_empty: bool = False,
+    executor: Executor | None = None,
+    batchsize: int = DEFAULT_BATCHSIZE
+) -> Iterator[tuple[AnyStr, list[AnyStr]]]:
+    """
+    Expand many braces and return an iterator of each pattern and its expansions in the order given.
+
+    Patterns repeated within the batches in flight, or among the last `batchsize` patterns expanded, are only
+    expanded once and share their list of expansions. Other expansions are dropped once they are yielded, so
+    memory does not grow with the whole output.
+    """
+
+    if batchsize < 1:
+        raise ValueError(f'Batch size must be a positive integer, not {batchsize:d}')
+
+    # The patterns are not cached as they are unlikely to be reused.
+    # `results` holds the expansions of the patterns of the batches in flight, and `users` how many of those
+    # batches each pattern is in. Once a pattern is no longer in flight, it is moved to the `recent` patterns.
+    results = {}  # type: dict[AnyStr, list[AnyStr]]
+    users = {}  # type: dict[AnyStr, int]
+    recent = OrderedDict()  # type: OrderedDict[AnyStr, list[AnyStr]]
+    pending = deque()  # type: deque[tuple[list[AnyStr], list[AnyStr], Future[list[list[AnyStr]]] | None]]
+    window = 2 * (os.cpu_count() or 1) if executor is not None else 1
+    it = iter(strings)
+    for batch in iter(lambda: list(itertools.islice(it, batchsize)), []):
+        new = []
+        for string in dict.fromkeys(batch):
+            if string in users:
+                users[string] += 1
+                continue
+            users[string] = 1
+            if string in recent:
+                results[string] = recent.pop(string)
+            else:
+                new.append(string)
+
+        if executor is None:
+            results.update(zip(new, _expand_batch(new, keep_escapes, limit, return_empty), strict=True))
+            pending.append((batch, new, None))
+        else:
+            pending.append((batch, new, executor.submit(_expand_batch, new, keep_escapes, limit, return_empty)))
+
+        while len(pending) >= window:
+            yield from _resolve_batch(pending.popleft(), results, users, recent, batchsize)
+
+    while pending:
+        yield from _resolve_batch(pending.popleft(), results, users, recent, batchsize)
+
+
+def _resolve_batch(
+    entry: tuple[list[AnyStr], list[AnyStr], Future[list[list[AnyStr]]] | None],
+    results: dict[AnyStr, list[AnyStr]],
+    users: dict[AnyStr, int],
+    recent: OrderedDict[AnyStr, list[AnyStr]],
+    keep: int
+) -> Iterator[tuple[AnyStr, list[AnyStr]]]:
+    """
+    Yield the expansions of a batch once its new patterns are expanded.
+
+    Patterns no longer used by a batch in flight are then moved to the `keep` most recent patterns.
+    """
+
+    batch, new, future = entry
+    if future is not None:
+        results.update(zip(new, future.result(), strict=True))
+    for string in batch:
+        yield string, results[string]
+
+    for string in dict.fromkeys(batch):
+        users[string] -= 1
+        if not users[string]:
+            del users[string]
+            recent[string] = results.pop(string)
+            if len(recent) > keep:
+                recent.popitem(last=False)
+
+
+def count(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> int:
+    """Count the expansions of braces without expanding them."""
+
+    return compile(string, keep_escapes, 0, return_empty).count()
+
+
+def nth(
+    string: AnyStr,
+    index: int,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> AnyStr:
+    """Get the expansion at the given index without expanding the expansions that precede it."""
+
+    return compile(string, keep_escapes, 0, return_empty)[index]
+
+
+def index_of(
+    string: AnyStr,
+    value: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> int | None:
+    """Get the index of the first expansion equal to the value, or `None` if the value is never expanded."""
+
+    return compile(string, keep_escapes, 0, return_empty).index_of(value)
+
+
+def match(
+    string: AnyStr,
+    value: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> bool:
+    """Check if the braces expand to the value without expanding them."""
+
+    return compile(string, keep_escapes, 0, return_empty).match(value)
+
+
+def to_regex(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> AnyStr:
+    """Translate braces into a regular expression pattern that fully matches each expansion."""
+
+    return compile(string, keep_escapes, 0, return_empty).to_regex()
+
+
+def parse(string: AnyStr, keep_escapes: bool = False) -> Node:
+    """
+    Parse braces into a tree of nodes.
+
+    A new tree is parsed on every call, so it is not shared with the pattern cache.
+    """
+
     if isinstance(string, bytes):
-        for entry in ExpandBrace(keep_escapes, limit, return_empty).expand(string.decode('latin-1')):
-            yield entry.encode('latin-1')
-    else:
-        for entry in ExpandBrace(keep_escapes, limit, return_empty).expand(string):
-            yield entry
+        return _encode(ExpandBrace(keep_escapes, 0).parse(string.decode('latin-1')))
+    return ExpandBrace(keep_escapes, 0).parse(string)
+
+
+def size(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> int:
+    """Get the total length of all the expansions without expanding them."""
+
+    return compile(string, keep_escapes, 0, return_empty).size()
+
+
+def stats(
+    string: AnyStr,
+    keep_escapes: bool = False,
+    return_empty: bool = False
+) -> Stats:
+    """Get statistics of the expansions without expanding them."""
+
+    return compile(string, keep_escapes, 0, return_empty).stats()
+
+
+def unique_strategy(
+    string: AnyStr,
+    unique: bool | int = True,
+    keep_escapes: bool = False,
+    return_empty: bool = False,
+    sort: bool = False
+) -> str | None:
+    """Get the strategy used to remove duplicate expansions with the given `unique` and `sort` options."""
+
+    return compile(string, keep_escapes, 0, return_empty).unique_strategy(unique, sort)
+
+
+def compress(strings: Iterable[AnyStr]) -> AnyStr:
+    """Compress strings into braces that expand to the same strings in the same order."""
+
+    items = list(strings)
+    if not items:
+        raise ValueError('Cannot compress an empty list of strings')
+    is_bytes = isinstance(items[0], bytes)
+    if any(isinstance(s, bytes) is not is_bytes for s in items):
+        raise TypeError('Cannot compress a mix of str and bytes')
+    if not all(items):
+        raise ValueError('Cannot compress empty strings as they are never expanded')
+
+    if is_bytes:
+        return _compress([s.decode('latin-1') for s in items]).encode('latin-1')  # type: ignore[attr-defined, return-value]
+    return _compress(items)  # type: ignore[arg-type, return-value]
+
+
+class BracePattern(Generic[AnyStr]):
+    """A parsed brace pattern that can be expanded repeatedly without being parsed again."""
+
+    __slots__ = (
+        '_node', '_proven', '_size', '_values', 'keep_escapes', 'limit', 'pattern', 'return_empty'
+    )
+
+    pattern: AnyStr
+    keep_escapes: bool
+    limit: int
+    return_empty: bool
+    _node: Node
+    _values: Node
+    _proven: bool | None
+    _size: int | None
+
+    def __init__(
+        self,
+        pattern: AnyStr,
+        keep_escapes: bool = False,
+        limit: int = DEFAULT_LIMIT,
+        return_empty: bool = False,
+        cancel: CancellationToken | None = None
+    ) -> None:
+        """Initialize."""
+
+        is_bytes = isinstance(pattern, bytes)
+        node = ExpandBrace(keep_escapes, limit, return_empty, cancel).parse(
+            pattern.decode('latin-1') if is_bytes else pattern  # type: ignore[arg-type]
+        )
+
+        # Attributes are set directly, as a pattern is built on every cache miss.
+        init = object.__setattr__
+        init(self, 'pattern', pattern)
+        init(self, 'keep_escapes', keep_escapes)
+        init(self, 'limit', limit)
+        init(self, 'return_empty', return_empty)
+        init(self, '_node', node)
+        # Byte string patterns are expanded from a copy yielding byte strings directly.
+        init(self, '_values', _encode(node) if is_bytes else node)
+        # Whether the pattern is proven to never expand duplicates, and the total length of the expansions,
+        # found when first needed.
+        init(self, '_proven', None)
+        init(self, '_size', None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Prevent mutation."""
+
+        raise AttributeError(f"'{self.__class__.__name__}' is immutable")
+
+    def __hash__(self) -> int:
+        """Hash."""
+
+        return hash((type(self), self.pattern, self.keep_escapes, self.limit, self.return_empty))
+
+    def __eq__(self, other: Any) -> bool:
+        """Equal."""
+
+        return (
+            isinstance(other, BracePattern) and
+            self.pattern == other.pattern and
+            self.keep_escapes == other.keep_escapes and
+            self.limit == other.limit and
+            self.return_empty == other.return_empty
+        )
+
+    def __repr__(self) -> str:  # pragma: no cover
+        """Representation."""
+
+        return (
+            f'{self.__class__.__name__}({self.pattern!r}, keep_escapes={self.keep_escapes!r}, '
+            f'limit={self.limit!r}, return_empty={self.return_empty!r})'
+        )
+
+    def __len__(self) -> int:
+        """Length."""
+
+        return self.count()
+
+    def __getitem__(self, index: int) -> AnyStr:
+        """Get the expansion at the given index."""
+
+        index = operator.index(index)
+        total = self.count()
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError('Expansion index out of range')
+
+        if self._node.count == self._node.empty:
+            return b'' if isinstance(self.pattern, bytes) else ''
+        return self._values.get(_seek(self._node, index))  # type: ignore[return-value]
+
+    def index_of(self, value: AnyStr) -> int | None:
+        """Get the index of the first expansion equal to the value, or `None` if the value is never expanded."""
+
+        if isinstance(value, bytes) is not isinstance(self.pattern, bytes):
+            raise TypeError(f'Cannot search a {type(self.pattern).__name__} pattern for {type(value).__name__}')
+
+        string = value.decode('latin-1') if isinstance(value, bytes) else value
+        if self._node.count == self._node.empty:
+            return 0 if self.return_empty and not string else None
+        return _rank(self._node, string)
+
+    def match(self, value: AnyStr) -> bool:
+        """Check if the pattern expands to the value without expanding it."""
+
+        return self.index_of(value) is not None
+
+    def __contains__(self, value: AnyStr) -> bool:
+        """Check if the pattern expands to the value."""
+
+        return self.index_of(value) is not None
+
+    def to_regex(self) -> AnyStr:
+        """Translate the pattern into a regular expression pattern that fully matches each expansion."""
+
+        pattern = _to_regex(self._node, self.return_empty)
+        return pattern.encode('latin-1') if isinstance(self.pattern, bytes) else pattern
+
+    def count(self) -> int:
+        """Count the expansions without expanding them."""
+
+        total = self._node.count - self._node.empty
+        return 1 if not total and self.return_empty else total
+
+    def size(self) -> int:
+        """Get the total length of all the expansions without expanding them."""
+
+        if self._size is None:
+            super().__setattr__('_size', _size(self._node))
+        return self._size  # type: ignore[return-value]
+
+    def stats(self) -> Stats:
+        """Get statistics of the expansions without expanding them."""
+
+        node = self._node
+        count = self.count()
+        total = self.size()
+        _, shortest, longest = _lengths(node)
+        groups = [n for n in _walk(node) if isinstance(n, (Alternation, IntRange, CharRange))]
+        return Stats(
+            count,
+            total,
+            shortest or 0,
+            longest if shortest is not None else 0,
+            total / count if count else 0.0,
+            _depth(node),
+            len(groups),
+            max((n.count for n in groups if isinstance(n, (IntRange, CharRange))), default=0)
+        )
+
+    def span(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None
+    ) -> tuple[int, int]:
+        """
+        Resolve the `start` and `stop` indexes of a slice of the expansions.
+
+        Indexes are treated like slice indexes. If `shard` is given as `(k, n)`, the slice is split into `n`
+        contiguous parts of near equal size, and the span of part `k` is returned.
+        """
+
+        first, last, _ = slice(start, stop).indices(self.count())
+        last = max(first, last)
+        if shard is not None:
+            k, n = shard
+            if not 0 <= k < n:
+                raise ValueError(f'Shard {k:d} is not within the range of {n:d} shards')
+            size = last - first
+            first, last = first + size * k // n, first + size * (k + 1) // n
+        return first, last
+
+    def unique_strategy(self, unique: bool | int = True, sort: bool = False) -> str | None:
+        """
+        Get the strategy used to remove duplicate expansions with the given `unique` and `sort` options.
+
+        `None` is returned if duplicates are not removed, `'proven'` if the pattern was proven to never expand
+        duplicates, `'sorted'` if duplicates are removed as they follow each other in sorted order, `'exact'` if
+        duplicates are removed with a set, and `'filter'` if duplicates are removed with a probabilistic filter.
+        """
+
+        if not isinstance(unique, bool) and unique <= 0:
+            raise ValueError(f'The size of the filter must be greater than 0, not {unique:d}')
+        if not unique:
+            return None
+        if self._proven is None:
+            super().__setattr__('_proven', _unique.is_unique(self._node))
+        if self._proven:
+            return 'proven'
+        if sort:
+            return 'sorted'
+        return 'exact' if unique is True else 'filter'
+
+    def expand(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None,
+        unique: bool | int = False,
+        sort: bool = False,
+        timeout: float | None = None,
+        cancel: CancellationToken | None = None
+    ) -> list[AnyStr]:
+        """Expand braces."""
+
+        if (
+            start is None and stop is None and shard is None and unique is False and not sort and
+            timeout is None and cancel is None
+        ):
+            # All the expansions are wanted, so the values are gathered without seeking or counting.
+            is_bytes = isinstance(self.pattern, bytes)
+            blank = EMPTY_BYTES if is_bytes else EMPTY
+            node = self._values
+            found = _collect(node) if node.count <= MAX_CACHED else node
+            values = [x for x in found if x is not blank]  # type: list[Any]
+            if not values and self.return_empty:
+                values.append(b'' if is_bytes else '')
+            return values
+
+        return list(self.iexpand(start, stop, shard, unique, sort, timeout, cancel))
+
+    def iexpand(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None,
+        unique: bool | int = False,
+        sort: bool = False,
+        timeout: float | None = None,
+        cancel: CancellationToken | None = None
+    ) -> Iterator[AnyStr]:
+        """
+        Expand braces and return an iterator.
+
+        If `unique` is enabled, duplicate expansions are removed, keeping the first of each. With `True`, the
+        expansions seen so far are kept in a set. With an integer, they are tracked in a probabilistic filter
+        of that many bytes, which uses a fixed amount of memory but may remove a few expansions that are not
+        duplicates. Duplicates are not tracked at all if the pattern is proven to never expand any, and are
+        simply skipped if `sort` is enabled.
+
+        If `sort` is enabled, the expansions are yielded in sorted order, and `start`, `stop`, and `shard` select
+        from the sorted expansions.
+
+        If `timeout` (in seconds) passes or the `cancel` token is cancelled, an `ExpansionCancelledException` is
+        raised. Cancellation is checked every `CANCEL_INTERVAL` expansions.
+        """
+
+        if timeout is not None:
+            cancel = CancellationToken(timeout, cancel)
+
+        strategy = self.unique_strategy(unique, sort)
+        values = self._isorted(start, stop, shard) if sort else self._iexpand(start, stop, shard)
+        if strategy == 'sorted':
+            values = _unique.adjacent(values)
+        elif strategy == 'exact':
+            values = _unique.exact(values)
+        elif strategy == 'filter':
+            first, last = self.span(start, stop, shard)
+            values = _unique.filtered(values, unique, last - first)
+        if cancel is not None:
+            values = self._cancellable(values, cancel)
+        yield from values
+
+    def iexpand_chunks(
+        self,
+        size: int = DEFAULT_BATCHSIZE,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None,
+        unique: bool | int = False,
+        sort: bool = False,
+        timeout: float | None = None,
+        cancel: CancellationToken | None = None
+    ) -> Iterator[list[AnyStr]]:
+        """
+        Expand braces and return an iterator of lists of `size` expansions, the last of which may be shorter.
+
+        Unless duplicates have to be removed or the expansions are sorted, the lists are built directly from
+        runs of values of the pattern's last group instead of gathering the expansions one at a time.
+        """
+
+        if size < 1:
+            raise ValueError(f'The chunk size must be greater than 0, not {size:d}')
+
+        if timeout is not None:
+            cancel = CancellationToken(timeout, cancel)
+
+        if sort or self.unique_strategy(unique, sort) not in (None, 'proven'):
+            values = self.iexpand(start, stop, shard, unique, sort, cancel=cancel)
+            while chunk := list(itertools.islice(values, size)):
+                yield chunk
+            return
+
+        produced = 0
+        pending = []  # type: list[AnyStr]
+        for block in self._iblocks(start, stop, shard):
+            if cancel is not None:
+                cancel.check(produced)
+            produced += len(block)
+
+            i = 0
+            if pending:
+                i = size - len(pending)
+                pending.extend(block[:i])
+                if len(pending) < size:
+                    continue
+                yield pending
+            end = len(block) - size
+            while i <= end:
+                yield block[i:i + size]
+                i += size
+            pending = block[i:]
+        if pending:
+            yield pending
+
+    @staticmethod
+    def _cancellable(values: Iterator[AnyStr], cancel: CancellationToken) -> Iterator[AnyStr]:
+        """Check the token for cancellation between batches of expansions."""
+
+        produced = 0
+        while True:
+            cancel.check(produced)
+            batch = tuple(itertools.islice(values, CANCEL_INTERVAL))
+            if not batch:
+                return
+            yield from batch
+            produced += len(batch)
+
+    def _isorted(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None
+    ) -> Iterator[AnyStr]:
+        """Expand braces in sorted order, duplicates included."""
+
+        is_bytes = isinstance(self.pattern, bytes)
+        node = self._values
+        first, last = self.span(start, stop, shard)
+        if first == last:
+            return
+
+        if node.count == node.empty:
+            # Only `return_empty` can yield a value.
+            yield b'' if is_bytes else ''  # type: ignore[misc]
+            return
+
+        # Sorted expansions cannot be sought, so the expansions before the first are skipped. Counts can be too
+        # large for `islice`, so they are skipped a run at a time and the rest are counted down.
+        blank = EMPTY_BYTES if is_bytes else EMPTY
+        values = (x for x in _sorted_values(node, blank) if x is not blank)
+        skip = first
+        while skip:
+            run = min(skip, sys.maxsize)
+            deque(itertools.islice(values, run), 0)
+            skip -= run
+
+        remaining = last - first
+        for x in values:
+            yield x
+            remaining -= 1
+            if not remaining:
+                break
+
+    def _iexpand(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None
+    ) -> Iterator[AnyStr]:
+        """Expand braces in order, duplicates included."""
+
+        is_bytes = isinstance(self.pattern, bytes)
+        node = self._node
+        first, last = self.span(start, stop, shard)
+        if first == last:
+            return
+
+        if node.count == node.empty:
+            # Only `return_empty` can yield a value.
+            yield b'' if is_bytes else ''  # type: ignore[misc]
+            return
+
+        # Seek straight to the first value and stop once the last is reached.
+        blank = EMPTY_BYTES if is_bytes else EMPTY
+        remaining = last - first
+        for x in self._values.iter_from(_seek(node, first)):
+            if x is blank:
+                continue
+            yield x  # type: ignore[misc]
+            remaining -= 1
+            if not remaining:
+                break
+
+    def _iblocks(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        shard: tuple[int, int] | None = None
+    ) -> Iterator[list[AnyStr]]:
+        """Expand braces in order, duplicates included, as lists of expansions."""
+
+        is_bytes = isinstance(self.pattern, bytes)
+        node = self._node
+        first, last = self.span(start, stop, shard)
+        if first == last:
+            return
+
+        if node.count == node.empty:
+            # Only `return_empty` can yield a value.
+            yield [b'' if is_bytes else '']  # type: ignore[list-item]
+            return
+
+        blank = EMPTY_BYTES if is_bytes else EMPTY
+        remaining = last - first
+        for block in self._values.iter_blocks(_seek(node, first)):
+            if node.empty:
+                block = [x for x in block if x is not blank]
+            if len(block) >= remaining:
+                yield block[:remaining]  # type: ignore[misc]
+                return
+            if block:
+                yield block  # type: ignore[misc]
+                remaining -= len(block)
 
 
 class StringIter:
@@ -106,7 +1119,14 @@ class StringIter:
     def __next__(self) -> str:
         """Python 3 iterator compatible next."""
 
-        return self.iternext()
+        # Same as `iternext`, without the extra call, as it is called for every character.
+        try:
+            char = self._string[self._index]
+            self._index += 1
+        except IndexError as e:
+            raise StopIteration from e
+
+        return char
 
     def match(self, pattern: Pattern[str]) -> Match[str] | None:
         """Perform regex match at index."""
@@ -159,11 +1179,13 @@ class ExpandBrace:
         self,
         keep_escapes: bool = False,
         limit: int = DEFAULT_LIMIT,
-        return_empty: bool = False
+        return_empty: bool = False,
+        cancel: CancellationToken | None = None
     ) -> None:
         """Initialize."""
 
         self.max_limit = limit
+        self.cancel = cancel
         self.expanding = False
         self.keep_escapes = keep_escapes
         self.return_empty = return_empty
@@ -205,28 +1227,7 @@ class ExpandBrace:
             escaped = ''
         return c + escaped if self.keep_escapes else escaped
 
-    def squash(self, a: Iterable[str], b: Iterable[str]) -> Iterator[str]:
-        """
-        Returns a generator that squashes two iterables into one.
-
-        ```
-        ['this', 'that'], [[' and', ' or']] => ['this and', 'this or', 'that and', 'that or']
-        ```
-        """
-
-        for x in itertools.product(a, b):
-            if all(i is EMPTY for i in x):
-                yield EMPTY
-            else:
-                yield ''.join(x)
-
-    def chain(self, *iterables: Any) -> Iterator[str]:
-        """Chain iterables."""
-
-        for iterable in iterables:
-            yield from iterable
-
-    def flatten(self, iterables: Any) -> Iterator[str]:
+    def flatten(self, iterables: Any) -> Iterator[str | Node]:
         """Flatten out results."""
 
         for item in iterables:
@@ -241,7 +1242,7 @@ class ExpandBrace:
         i: StringIter,
         depth: int,
         ignore_end: bool = False
-    ) -> tuple[list[str | Iterator[str]], int]:
+    ) -> tuple[list[str | Node], int]:
         """
         Get a string literal.
 
@@ -249,7 +1250,7 @@ class ExpandBrace:
         Also gather chars between braces and commas within a group (is_expanding).
         """
 
-        result = []  # type: list[str | Iterator[str]]
+        result = []  # type: list[str | Node]
         is_dollar = False
         count = 1
         literal = ''
@@ -295,7 +1296,9 @@ class ExpandBrace:
                     i.rewind(1)
                     break
                 else:
-                    literal += c
+                    # Take the whole run of characters that cannot start or end anything.
+                    m = i.match(RE_LITERAL)
+                    literal += c + m.group(0) if m else c
 
                 c = next(i)
         except StopIteration:
@@ -305,7 +1308,16 @@ class ExpandBrace:
 
         return result, self.account(count)
 
-    def get_sequence(self, c: str, i: StringIter, depth: int) -> tuple[Iterator[str], int]:
+    def get_node(self, value: str | Node | list[Any]) -> Node:
+        """Convert a parsed value into a node."""
+
+        if isinstance(value, str):
+            return Literal(value)
+        if isinstance(value, list):
+            return make_sequence([self.get_node(v) for v in value])
+        return value
+
+    def get_sequence(self, c: str, i: StringIter, depth: int) -> tuple[Node, int]:
         """
         Get the sequence.
 
@@ -313,7 +1325,11 @@ class ExpandBrace:
         It will basically crawl to the end or find a valid series.
         """
 
-        result = []  # type: list[str | Iterator[str] | Iterable[str | Iterator[str]]]
+        # Patterns with a great number of groups can take a while to parse.
+        if self.cancel is not None:
+            self.cancel.check()
+
+        result = []  # type: list[str | Node | list[str | Node]]
         release = self.set_expanding()
         has_comma = False  # Used to indicate validity of group (`{1..2}` are an exception).
         is_empty = True  # Tracks whether the current slot is empty `{slot,slot,slot}`.
@@ -322,6 +1338,13 @@ class ExpandBrace:
         # Detect numerical and alphabetic series: `{1..2}` etc.
         i.rewind(1)
         item, count = self.get_range(i)
+        if item is None:
+            # Options of plain text, such as `{a,b,}`, are taken in one step.
+            m = i.match(RE_OPTIONS)
+            if m:
+                self.release_expanding(release)
+                options = m.group(1).split(',')
+                return make_alternation([Literal(o) for o in options]), self.account(len(options))
         i.advance(1)
         if item is not None:
             self.release_expanding(release)
@@ -344,32 +1367,13 @@ class ExpandBrace:
 
                     # Sequence is not valid
                     if not has_comma:
-                        count = 1
-                        temp = iter(['{'])
-                        for r in self.flatten(result):
-                            temp = self.squash(temp, [r] if isinstance(r, str) else r)
-                        temp = self.squash(temp, ['}'])
-                        return temp, self.account(math.prod(counts, start=1))
+                        nodes = [InvalidBrace('{')]  # type: list[Node]
+                        nodes.extend(self.get_node(r) for r in self.flatten(result))
+                        nodes.append(InvalidBrace('}'))
+                        return make_sequence(nodes), self.account(math.prod(counts, start=1))
 
                     # Format return for a sequence
-                    fin = iter([])  # type: Iterator[str]
-                    start = 0
-                    l = len(result)
-                    for e, x in enumerate(result):
-                        if not isinstance(x, str):
-                            if e != start:
-                                fin = self.chain(fin, result[start:e])
-                            if isinstance(x, list):
-                                temp = iter([EMPTY])
-                                for y in x:
-                                    temp = self.squash(temp, [y] if isinstance(y, str) else y)
-                                fin = self.chain(fin, temp)
-                            else:
-                                fin = self.chain(fin, result[e])
-                            start = e + 1
-                    if start < l:
-                        fin = self.chain(fin, result[start:])
-                    return fin, self.account(sum(counts))
+                    return make_alternation([self.get_node(x) for x in result]), self.account(sum(counts))
 
                 elif c == ',':
                     # Must be the first element in the list.
@@ -397,16 +1401,18 @@ class ExpandBrace:
             self.release_expanding(release)
 
         # Sequence is not valid
-        temp2 = iter(['{'])  # type: Iterator[str]
-        l = len(result)
+        nodes = [InvalidBrace('{')]
         last_str = False
         for r in self.flatten(result):
-            is_str = isinstance(r, str)
-            temp2 = self.squash(temp2, [(',' if last_str else '') + r] if is_str else r)
-            last_str = is_str
-        return temp2, self.account(math.prod(counts, start=1))
+            if isinstance(r, str):
+                nodes.append(Literal((',' if last_str else '') + r))
+                last_str = True
+            else:
+                nodes.append(r)
+                last_str = False
+        return make_sequence(nodes), self.account(math.prod(counts, start=1))
 
-    def get_range(self, i: StringIter) -> tuple[Iterator[str] | None, int]:
+    def get_range(self, i: StringIter) -> tuple[Node | None, int]:
         """
         Check and retrieve range if value is a valid range.
 
@@ -429,13 +1435,7 @@ class ExpandBrace:
 
         return None, 0
 
-    def format_values(self, values: Iterable[int], padding: int) -> Iterator[str]:
-        """Get padding adjusting for negative values."""
-
-        for value in values:
-            yield "{:0{pad}d}".format(value, pad=padding) if padding else str(value)
-
-    def get_int_range(self, m: re.Match[str]) -> tuple[Iterator[str], int]:
+    def get_int_range(self, m: re.Match[str]) -> tuple[Node, int]:
         """Get an integer range between start and end and increments of increment."""
 
         # Capture zero padding extent and capture numerical values without padding and limited to 19 digits.
@@ -461,20 +1461,10 @@ class ExpandBrace:
         epad_len = epad[1] - epad[0]
         padding = max(spad_len + len(start), epad_len + len(end)) if spad_len or epad_len else 0
 
-        if first < last:
-            span = abs(last - first + 1)
-            ainc = abs(inc)
-            count = math.ceil(span / ainc) if ainc <= span else 1
-            r = range(first, last + 1, inc)
-        else:
-            span = abs(first - last + 1)
-            ainc = abs(inc)
-            count = math.ceil(span / ainc) if ainc <= span else 1
-            r = range(first, last - 1, -inc)
-
-        return self.format_values(r, padding), count
+        node = IntRange(first, last, inc, padding)
+        return node, node.count
 
-    def get_char_range(self, m: re.Match[str]) -> tuple[Iterator[str], int]:
+    def get_char_range(self, m: re.Match[str]) -> tuple[Node, int]:
         """Get a range of alphabetic characters."""
 
         start = m.group(1)
@@ -489,45 +1479,33 @@ class ExpandBrace:
         # Ensure values are within 64 bit range.
         inc = max(1, int64(increment))
 
-        inverse = start > end
-        alpha = _nalpha if inverse else _alpha
+        node = CharRange(start, end, inc, _nalpha if start > end else _alpha)
+        return node, node.count
 
-        first = alpha.index(start)
-        last = alpha.index(end)
+    def parse(self, string: str) -> Node:
+        """Parse the string into a tree of nodes."""
 
-        if first < last:
-            span = last - first + 1
-            count = math.ceil(span / inc) if inc <= abs(span) else 1
-            r = range(first, last + 1, inc)
-        else:
-            span = first - last + 1
-            count = math.ceil(span / inc) if inc <= abs(span) else 1
-            r = range(first, last - 1, -inc)
-        return (alpha[i] for i in r), count
+        self.expanding = False
+        if not string:
+            return Literal(EMPTY)
 
-    def expand_str(self, string: str) -> Iterator[str]:
-        """Expand the string."""
+        # Without braces or escapes, there is nothing to parse.
+        if '{' not in string and '\\' not in string:
+            return Literal(string)
 
         i = StringIter(string)
         values, _ = self.get_literals(next(i), i, 0)
-
-        # Squash the nested list by calculating the combinations
-        results = iter([EMPTY])  # type: Iterator[str]
-        for v in values:
-            results = self.squash(results, [v] if isinstance(v, str) else v)
-        return results
+        return make_sequence([self.get_node(v) for v in values])
 
     def expand(self, string: str) -> Iterator[str]:
         """Expand."""
 
-        self.expanding = False
         found_literal = False
-        if string:
-            for x in self.expand_str(string):
-                if x is EMPTY:
-                    continue
-                found_literal = True
-                yield x
+        for x in self.parse(string):
+            if x is EMPTY:
+                continue
+            found_literal = True
+            yield x
 
         if not found_literal and self.return_empty:
             yield ""
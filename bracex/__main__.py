@@ -1,5 +1,5 @@
 """
-Expands a bash-style brace expression, and outputs each expansion.
+Expands bash-style brace expressions, and outputs each expansion.
 
 Licensed under MIT
 Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
@@ -21,8 +21,16 @@ IN THE SOFTWARE.
 """
 from __future__ import annotations
 import argparse
+import itertools
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor  # noqa: F401
+from typing import Iterable, Iterator, TextIO
 import bracex
 
+# The number of lines sent to a worker at once.
+BATCHSIZE = 100
+
 
 def main(argv: str | None = None) -> None:
     """Accept command line arguments and output brace expansion to stdout."""
@@ -31,10 +39,18 @@ def main(argv: str | None = None) -> None:
         description='Expands a bash-style brace expression, and outputs each expansion.',
         allow_abbrev=False,
     )
-    parser.add_argument(
+    sources = parser.add_mutually_exclusive_group()
+    sources.add_argument(
         'expression',
+        nargs='?',
         help="Brace expression to expand",
     )
+    sources.add_argument(
+        '--from-file', '-f',
+        type=argparse.FileType('r', encoding='utf-8'),
+        metavar='FILE',
+        help="Expand each line of FILE as a brace expression, or of stdin if FILE is -",
+    )
     terminators = parser.add_mutually_exclusive_group()
     terminators.add_argument(
         '--terminator', '-t',
@@ -49,6 +65,37 @@ def main(argv: str | None = None) -> None:
         dest='terminator',
         help="Terminate each expansion with a NUL character",
     )
+    parser.add_argument(
+        '--start',
+        type=int,
+        metavar='N',
+        help="Skip to expansion N without generating the expansions before it (negative counts from the end)",
+    )
+    parser.add_argument(
+        '--stop',
+        type=int,
+        metavar='N',
+        help="Stop before expansion N (negative counts from the end)",
+    )
+    parser.add_argument(
+        '--shard',
+        type=int,
+        nargs=2,
+        metavar=('K', 'N'),
+        help="Split the expansions into N contiguous shards and only output shard K (0 based)",
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        metavar='N',
+        help="Expand the lines of --from-file across N worker processes, keeping their order (default: 1)",
+    )
+    parser.add_argument(
+        '--line-number', '-n',
+        action='store_true',
+        help="Prefix each expansion with the line number of its expression and a colon",
+    )
     parser.add_argument(
         '--version',
         action='version',
@@ -57,11 +104,86 @@ def main(argv: str | None = None) -> None:
 
     args = parser.parse_args(argv)
 
-    for expansion in bracex.iexpand(args.expression, limit=0):
-        print(expansion, end=args.terminator)
+    shard = tuple(args.shard) if args.shard else None
+    if shard is not None and not 0 <= shard[0] < shard[1]:
+        parser.error(f"argument --shard: shard {shard[0]:d} is not within the range of {shard[1]:d} shards")
+
+    if args.expression is None and args.from_file is None:
+        parser.error("the following arguments are required: expression")
+    if args.jobs < 1:
+        parser.error(f"argument --jobs/-j: the number of jobs must be greater than 0, not {args.jobs:d}")
+    if args.jobs > 1 and args.from_file is None:
+        parser.error("argument --jobs/-j: only allowed with argument --from-file/-f")
+
+    if args.from_file is None:
+        prefix = '1:' if args.line_number else ''
+        for expansion in bracex.iexpand(args.expression, limit=0, start=args.start, stop=args.stop, shard=shard):
+            print(prefix + expansion, end=args.terminator)
+        raise SystemExit(0)
+
+    with args.from_file as f:
+        lines = (line.rstrip('\n') for line in f)
+        if args.jobs > 1:
+            with ProcessPoolExecutor(args.jobs) as executor:
+                results = _expand_parallel(lines, args.start, args.stop, shard, executor, args.jobs)
+                _write(results, args.terminator, args.line_number, sys.stdout)
+        else:
+            _write(
+                (bracex.iexpand(line, limit=0, start=args.start, stop=args.stop, shard=shard) for line in lines),
+                args.terminator,
+                args.line_number,
+                sys.stdout
+            )
 
     raise SystemExit(0)
 
 
+def _write(results: Iterable[Iterable[str]], terminator: str, line_number: bool, out: TextIO) -> None:
+    """Write the expansions of each line as soon as they are available."""
+
+    for number, expansions in enumerate(results, 1):
+        if line_number:
+            prefix = f'{number:d}:'
+            out.writelines(prefix + expansion + terminator for expansion in expansions)
+        else:
+            out.writelines(expansion + terminator for expansion in expansions)
+
+
+def _expand_parallel(
+    lines: Iterable[str],
+    start: int | None,
+    stop: int | None,
+    shard: tuple[int, int] | None,
+    executor: ProcessPoolExecutor,
+    jobs: int
+) -> Iterator[list[str]]:
+    """
+    Expand batches of lines in the executor and return an iterator of the expansions of each line in order.
+
+    Only a few batches per worker are read ahead, so lines are read and written as a stream.
+    """
+
+    pending = deque()  # type: deque[Future[list[list[str]]]]
+    it = iter(lines)
+    for batch in iter(lambda: list(itertools.islice(it, BATCHSIZE)), []):
+        pending.append(executor.submit(_expand_batch, batch, start, stop, shard))
+        while len(pending) >= 2 * jobs:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _expand_batch(
+    lines: list[str],
+    start: int | None,
+    stop: int | None,
+    shard: tuple[int, int] | None
+) -> list[list[str]]:
+    """Expand a batch of lines in a worker."""
+
+    return [bracex.expand(line, limit=0, start=start, stop=stop, shard=shard) for line in lines]
+
+
 if __name__ == '__main__':
     main()  # pragma: no cover
@@ -0,0 +1,202 @@
+"""
+Compress lists of strings into brace patterns.
+
+Licensed under MIT
+Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+from __future__ import annotations
+import itertools
+import operator
+import re
+
+# Integers are limited so they stay within the 64 bit range ranges are parsed with.
+RE_INT = re.compile(r'-?\d{1,18}')
+ESCAPES = str.maketrans({c: '\\' + c for c in '\\{},$'})
+
+# The fewest values worth writing as a range instead of listing them.
+MIN_RUN = 3
+
+FIRST = operator.itemgetter(slice(None, 1))
+LAST = operator.itemgetter(slice(-1, None))
+
+LOWER = range(ord('a'), ord('z') + 1)
+UPPER = range(ord('A'), ord('Z') + 1)
+
+
+def escape(value: str) -> str:
+    """Escape literal text."""
+
+    return value.translate(ESCAPES)
+
+
+def common_prefix(items: list[str]) -> str:
+    """Get the longest common prefix."""
+
+    first = min(items)
+    last = max(items)
+    for i, c in enumerate(first):
+        if c != last[i]:
+            return first[:i]
+    return first
+
+
+def common_suffix(items: list[str]) -> str:
+    """Get the longest common suffix."""
+
+    return common_prefix([s[::-1] for s in items])[::-1]
+
+
+def int_format(value: int, padding: int) -> str:
+    """Format an integer like an integer range does."""
+
+    return f'{value:0{padding}d}' if padding else str(value)
+
+
+def int_padding(first: str, last: str) -> int:
+    """Get the padding of an integer range from its written ends."""
+
+    padded = any(len(s.lstrip('-')) > 1 and s.lstrip('-')[0] == '0' for s in (first, last))
+    return max(len(first), len(last)) if padded else 0
+
+
+def int_run(items: list[str], start: int) -> tuple[int, str] | None:
+    """Find a run of integers, returning the end of the run and the range pattern."""
+
+    if start + MIN_RUN > len(items) or not RE_INT.fullmatch(items[start]) or not RE_INT.fullmatch(items[start + 1]):
+        return None
+
+    first = int(items[start])
+    step = int(items[start + 1]) - first
+    if not step:
+        return None
+
+    # Find the values stepping evenly, then shrink the run until every value is formatted as the range would.
+    end = start + 2
+    value = first + step
+    while end < len(items) and RE_INT.fullmatch(items[end]) and int(items[end]) == value + step:
+        value += step
+        end += 1
+
+    while end - start >= MIN_RUN:
+        padding = int_padding(items[start], items[end - 1])
+        expected = [int_format(v, padding) for v in range(first, first + (end - start) * step, step)]
+        if items[start:end] == expected:
+            inc = f'..{abs(step):d}' if abs(step) != 1 else ''
+            return end, f'{{{items[start]}..{items[end - 1]}{inc}}}'
+        end = start + next(i for i, value in enumerate(expected) if items[start + i] != value)
+    return None
+
+
+def char_run(items: list[str], start: int) -> tuple[int, str] | None:
+    """Find a run of letters of the same case, returning the end of the run and the range pattern."""
+
+    if start + MIN_RUN > len(items) or len(items[start]) != 1 or len(items[start + 1]) != 1:
+        return None
+
+    first = ord(items[start])
+    alpha = LOWER if first in LOWER else UPPER if first in UPPER else None
+    step = ord(items[start + 1]) - first
+    if alpha is None or not step or ord(items[start + 1]) not in alpha:
+        return None
+
+    end = start + 2
+    value = first + step
+    while end < len(items) and len(items[end]) == 1 and ord(items[end]) == value + step and value + step in alpha:
+        value += step
+        end += 1
+
+    if end - start < MIN_RUN:
+        return None
+    inc = f'..{abs(step):d}' if abs(step) != 1 else ''
+    return end, f'{{{items[start]}..{items[end - 1]}{inc}}}'
+
+
+def find_run(items: list[str], start: int) -> tuple[int, str] | None:
+    """Find a run of integers or letters starting at the given position."""
+
+    return int_run(items, start) or char_run(items, start)
+
+
+def factor(items: list[str]) -> tuple[list[str], list[str]] | None:
+    """
+    Factor the items into the product of two lists.
+
+    The items are split into equal blocks, each block being a head followed by the same list of tails.
+    The smallest possible blocks are used, larger products are found when the heads are compressed.
+    """
+
+    total = len(items)
+    divisors = sorted({d for i in range(1, int(total ** 0.5) + 1) if not total % i for d in (i, total // i)})
+    for size in divisors[1:-1]:
+        heads = []
+        tails = None  # type: list[str] | None
+        for start in range(0, total, size):
+            block = items[start:start + size]
+            prefix = len(common_prefix(block))
+            rest = [s[prefix:] for s in block]
+            if tails is None:
+                tails = rest
+            elif rest != tails:
+                break
+            heads.append(block[0][:prefix])
+        else:
+            return heads, tails  # type: ignore[return-value]
+    return None
+
+
+def compress(items: list[str]) -> str:
+    """Compress the items into a pattern that expands to the same items in the same order."""
+
+    if len(items) == 1:
+        return escape(items[0])
+
+    # Factor out text shared by every item.
+    prefix = common_prefix(items)
+    if prefix:
+        items = [s[len(prefix):] for s in items]
+    suffix = common_suffix(items) if len(set(map(LAST, items))) == 1 else ''
+    if suffix:
+        items = [s[:-len(suffix)] for s in items]
+    if prefix or suffix:
+        return escape(prefix) + compress(items) + escape(suffix)
+
+    run = find_run(items, 0)
+    if run is not None and run[0] == len(items):
+        return run[1]
+
+    product = factor(items)
+    if product is not None:
+        return compress(product[0]) + compress(product[1])
+
+    # List the alternatives, grouping neighbors that start the same so they can be factored further.
+    options = []
+    index = 0
+    end = 0
+    for first, group in itertools.groupby(map(FIRST, items)):
+        end += len(list(group))
+        while index < end:
+            run = find_run(items, index)
+            if run is not None:
+                index, pattern = run
+                options.append(pattern)
+            elif not first:
+                options.append('')
+                index += 1
+            else:
+                options.append(compress(items[index:end]) if end - index > 1 else escape(items[index]))
+                index = end
+    return '{' + ','.join(options) + '}'
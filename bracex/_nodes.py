@@ -0,0 +1,818 @@
+"""
+Parsed brace pattern nodes.
+
+Licensed under MIT
+Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+from __future__ import annotations
+import bisect
+import copy
+import itertools
+import math
+import operator
+import re
+from typing import Iterator, Iterable, Any
+
+RE_NUM = re.compile(r'-?\d+')
+
+# Items of a sequence with no more values than this keep their values while the sequence is iterated.
+MAX_CACHED = 4096
+
+
+class Sentinel(str):
+    """A sentinel string value."""
+
+
+class BytesSentinel(bytes):
+    """A sentinel byte string value."""
+
+
+EMPTY = Sentinel('')
+EMPTY_BYTES = BytesSentinel(b'')
+
+
+class Node:
+    """
+    Base node of a parsed brace pattern.
+
+    `count` is the number of values the node yields and `empty` is how many of those values are empty slots.
+    """
+
+    __slots__ = ('count', 'empty')
+
+    def __init__(self, count: int, empty: int) -> None:
+        """Initialize."""
+
+        self.count = count
+        self.empty = empty
+
+    def __len__(self) -> int:
+        """Length."""
+
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        """Get the value at the given index (empty slots included)."""
+
+        index = operator.index(index)
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('Node index out of range')
+        return self.get(index)
+
+    def __iter__(self) -> Iterator[str]:  # pragma: no cover
+        """Iterate the node's values."""
+
+        raise NotImplementedError
+
+    def get(self, index: int) -> str:  # pragma: no cover
+        """Get the value at the given index (empty slots included)."""
+
+        raise NotImplementedError
+
+    def iter_from(self, index: int) -> Iterator[str]:  # pragma: no cover
+        """Iterate the node's values starting at the given index (empty slots included)."""
+
+        raise NotImplementedError
+
+    def iter_blocks(self, index: int) -> Iterator[list[str]]:
+        """Iterate lists of the node's values starting at the given index (empty slots included)."""
+
+        values = self.iter_from(index)
+        while block := list(itertools.islice(values, MAX_CACHED)):
+            yield block
+
+    def find(self, string: str, pos: int) -> list[tuple[int, int]]:  # pragma: no cover
+        """Find the values that match the string at the position and return their indexes and end positions."""
+
+        raise NotImplementedError
+
+
+class Literal(Node):
+    """A literal string, or an empty slot if the value is empty."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: str) -> None:
+        """Initialize."""
+
+        # Set directly, as a literal is created for every run of text in a pattern.
+        if value:
+            self.value = value
+            self.count, self.empty = 1, 0
+        else:
+            self.value = EMPTY_BYTES if isinstance(value, bytes) else EMPTY
+            self.count, self.empty = 1, 1
+
+    def __repr__(self) -> str:
+        """Representation."""
+
+        return f'{type(self).__name__}({self.value!r})'
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the node's values."""
+
+        yield self.value
+
+    def get(self, index: int) -> str:
+        """Get the value at the given index (empty slots included)."""
+
+        return self.value
+
+    def iter_from(self, index: int) -> Iterator[str]:
+        """Iterate the node's values starting at the given index (empty slots included)."""
+
+        if not index:
+            yield self.value
+
+
+class InvalidBrace(Literal):
+    """Literal text of a brace that does not form a group, such as the braces of `{a}` or an unclosed `{`."""
+
+    __slots__ = ()
+
+
+class Sequence(Node):
+    """Nodes that are joined together, iterating every combination of their values."""
+
+    __slots__ = ('items',)
+
+    # The empty slot sentinel and the joiner of the values.
+    blank = EMPTY  # type: Any
+    joiner = ''  # type: Any
+
+    def __init__(self, items: tuple[Node, ...]) -> None:
+        """Initialize."""
+
+        self.items = items
+        count = empty = 1
+        for n in items:
+            count *= n.count
+            empty *= n.empty
+        super().__init__(count, empty)
+
+    def __repr__(self) -> str:
+        """Representation."""
+
+        return f'{type(self).__name__}({self.items!r})'
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the node's values."""
+
+        return self.iter_from(0)
+
+    def get(self, index: int) -> str:
+        """Get the value at the given index (empty slots included)."""
+
+        parts = []
+        for n in reversed(self.items):
+            index, i = divmod(index, n.count)
+            parts.append(n.get(i))
+        if all(i is self.blank for i in parts):
+            return self.blank  # type: ignore[no-any-return]
+        return self.joiner.join(reversed(parts))  # type: ignore[no-any-return]
+
+    def iter_from(self, index: int) -> Iterator[str]:
+        """
+        Iterate the node's values starting at the given index (empty slots included).
+
+        The items are stepped through like an odometer: the last item is iterated, and when it runs out,
+        it is restarted and the item before it moves to its next value. The value of the items before
+        each position is kept, so each value only takes a single join. Items with few values are only
+        iterated once, their values are kept and reused on each restart.
+        """
+
+        blank = self.blank
+        sources, iters, _ = self.odometer(index)
+        last = len(sources) - 1
+
+        # `prefixes[k]` is the value of the items before `k`.
+        prefixes = [blank] * len(sources)
+        k = 0
+        while True:
+            x = next(iters[k], None)
+            if x is not None:
+                prefix = prefixes[k]
+                value = x if prefix is blank else prefix if x is blank else prefix + x
+                if k < last:
+                    k += 1
+                    prefixes[k] = value
+                    continue
+
+                yield value
+                for x in iters[k]:
+                    yield x if prefix is blank else prefix if x is blank else prefix + x
+
+            if not k:
+                return
+            iters[k] = iter(sources[k])
+            k -= 1
+
+    def iter_blocks(self, index: int) -> Iterator[list[str]]:
+        """
+        Iterate lists of the node's values starting at the given index (empty slots included).
+
+        The items are stepped through as in `iter_from`, but the values of the last item are joined to the kept
+        value in a single list, up to `MAX_CACHED` values at a time, instead of being yielded one by one.
+        """
+
+        blank = self.blank
+        sources, iters, tail_empty = self.odometer(index)
+        last = len(sources) - 1
+
+        prefixes = [blank] * len(sources)
+        k = 0
+        while True:
+            if k < last:
+                x = next(iters[k], None)
+                if x is not None:
+                    prefix = prefixes[k]
+                    k += 1
+                    prefixes[k] = x if prefix is blank else prefix if x is blank else prefix + x
+                    continue
+            else:
+                prefix = prefixes[k]
+                while part := list(itertools.islice(iters[k], MAX_CACHED)):
+                    if prefix is blank:
+                        yield part
+                    elif tail_empty:
+                        yield [prefix if x is blank else prefix + x for x in part]
+                    else:
+                        yield list(map(prefix.__add__, part))
+
+            if not k:
+                return
+            iters[k] = iter(sources[k])
+            k -= 1
+
+    def odometer(self, index: int) -> tuple[list[Any], list[Iterator[Any]], bool]:
+        """
+        Get the sources of each position and their iterators starting at the given index.
+
+        Also returns whether the last position can yield empty slots.
+        """
+
+        items = self.items
+        blank = self.blank
+        last = len(items) - 1
+
+        starts = [0] * len(items)
+        for k in range(last, -1, -1):
+            index, starts[k] = divmod(index, items[k].count)
+
+        # The first item is never restarted, so only the items after it keep their values.
+        sources = [
+            (n.value,) if isinstance(n, Literal) else n if not k or n.count > MAX_CACHED else tuple(n)
+            for k, n in enumerate(items)
+        ]  # type: list[Any]
+        tail_empty = items[last].empty > 0
+        iters = [
+            itertools.islice(s, i, None) if isinstance(s, tuple) else s.iter_from(i)
+            for s, i in zip(sources, starts, strict=True)
+        ]  # type: list[Iterator[Any]]
+
+        # Literal text at the end is joined to the kept values of the item before it up front,
+        # so building a value only ever appends the item that advanced. The values of the first
+        # item are not kept, but as they are only iterated once, the text is joined as they are.
+        tail = items[last]
+        source = sources[last - 1]
+        if (
+            last and isinstance(tail, Literal) and tail.value is not blank and
+            (last == 1 or isinstance(source, tuple))
+        ):
+            suffix = tail.value
+            if isinstance(source, tuple):
+                sources[last - 1] = tuple(suffix if x is blank else x + suffix for x in source)
+                iters[last - 1] = itertools.islice(sources[last - 1], starts[last - 1], None)
+            else:
+                iters[0] = (suffix if x is blank else x + suffix for x in iters[0])
+            del sources[last], iters[last]
+            tail_empty = False
+
+        return sources, iters, tail_empty
+
+
+class BytesSequence(Sequence):
+    """A sequence of nodes yielding byte strings."""
+
+    __slots__ = ()
+
+    blank = EMPTY_BYTES
+    joiner = b''
+
+
+class Alternation(Node):
+    """A brace group of comma separated options, iterating each option in turn."""
+
+    __slots__ = ('empty_offsets', 'items', 'offsets')
+
+    def __init__(self, items: tuple[Node, ...]) -> None:
+        """Initialize."""
+
+        self.items = items
+        # Running totals of values and empty slots preceding each option.
+        count = empty = 0
+        offsets = [0]
+        empty_offsets = [0]
+        for n in items:
+            count += n.count
+            empty += n.empty
+            offsets.append(count)
+            empty_offsets.append(empty)
+        self.offsets = tuple(offsets)
+        self.empty_offsets = tuple(empty_offsets)
+        super().__init__(count, empty)
+
+    def __repr__(self) -> str:
+        """Representation."""
+
+        return f'{type(self).__name__}({self.items!r})'
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the node's values."""
+
+        for n in self.items:
+            yield from n
+
+    def get(self, index: int) -> str:
+        """Get the value at the given index (empty slots included)."""
+
+        i = bisect.bisect_right(self.offsets, index) - 1
+        return self.items[i].get(index - self.offsets[i])
+
+    def iter_from(self, index: int) -> Iterator[str]:
+        """Iterate the node's values starting at the given index (empty slots included)."""
+
+        i = bisect.bisect_right(self.offsets, index) - 1
+        yield from self.items[i].iter_from(index - self.offsets[i])
+        for n in self.items[i + 1:]:
+            yield from n
+
+    def locate(self, index: int, total: int, empty: int) -> tuple[int, int]:
+        """
+        Find the option containing the non-empty value at index, and the index relative to that option.
+
+        Each option is followed by values totalling `total`, `empty` of which are empty slots.
+        """
+
+        offsets = self.offsets
+        empty_offsets = self.empty_offsets
+
+        def key(i: int) -> int:
+            """Number of non-empty values preceding option `i`."""
+
+            return offsets[i] * total - empty_offsets[i] * empty
+
+        i = bisect.bisect_right(range(len(offsets)), index, key=key) - 1
+        return i, index - key(i)
+
+
+class IntRange(Node):
+    """A numerical range such as `{1..10..2}`."""
+
+    __slots__ = ('padding', 'start', 'step', 'stop', 'values', 'widths')
+
+    def __init__(self, start: int, stop: int, step: int, padding: int) -> None:
+        """Initialize."""
+
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.padding = padding
+        self.values = range(start, stop + 1, step) if start < stop else range(start, stop - 1, -step)
+        super().__init__(len(self.values), 0)
+
+        # Shortest and longest formatted values. Widths only grow as values move away from zero.
+        first, last = self.values[0], self.values[-1]
+        widths = [len(self.get(0)), len(self.get(-1))]
+        self.widths = (1 if (first < 0) is not (last < 0) else min(widths), max(widths))
+
+    def __repr__(self) -> str:
+        """Representation."""
+
+        return f'{type(self).__name__}({self.start!r}, {self.stop!r}, {self.step!r}, {self.padding!r})'
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the node's values."""
+
+        return self.format(self.values)
+
+    def get(self, index: int) -> str:
+        """Get the value at the given index."""
+
+        value = self.values[index]
+        return f'{value:0{self.padding}d}' if self.padding else str(value)
+
+    def iter_from(self, index: int) -> Iterator[str]:
+        """Iterate the node's values starting at the given index."""
+
+        return self.format(self.values[index:])
+
+    def format(self, values: range) -> Iterator[str]:
+        """Iterate the integers formatted like the node's values."""
+
+        padding = self.padding
+        for value in values:
+            yield f'{value:0{padding}d}' if padding else str(value)
+
+    def find(self, string: str, pos: int) -> list[tuple[int, int]]:
+        """Find the values that match the string at the position and return their indexes and end positions."""
+
+        m = RE_NUM.match(string, pos)
+        if m is None:
+            return []
+
+        found = []
+        padding = self.padding
+        shortest, longest = self.widths
+        for end in range(pos + shortest, min(m.end(), pos + longest) + 1):
+            text = string[pos:end]
+            if text == '-':
+                continue
+            value = int(text)
+            if value in self.values and text == (f'{value:0{padding}d}' if padding else str(value)):
+                found.append((self.values.index(value), end))
+        found.sort()
+        return found
+
+
+class CharRange(Node):
+    """An alphabetic range such as `{a..z..2}`."""
+
+    __slots__ = ('chars', 'start', 'step', 'stop')
+
+    def __init__(self, start: str, stop: str, step: int, alpha: list[str]) -> None:
+        """Initialize."""
+
+        self.start = start
+        self.stop = stop
+        self.step = step
+
+        first = alpha.index(start)
+        last = alpha.index(stop)
+        r = range(first, last + 1, step) if first < last else range(first, last - 1, -step)
+        self.chars = tuple(alpha[i] for i in r)
+        super().__init__(len(self.chars), 0)
+
+    def __repr__(self) -> str:
+        """Representation."""
+
+        return f'{type(self).__name__}({self.start!r}, {self.stop!r}, {self.step!r})'
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate the node's values."""
+
+        yield from self.chars
+
+    def get(self, index: int) -> str:
+        """Get the value at the given index."""
+
+        return self.chars[index]
+
+    def iter_from(self, index: int) -> Iterator[str]:
+        """Iterate the node's values starting at the given index."""
+
+        yield from self.chars[index:]
+
+    def find(self, string: str, pos: int) -> list[tuple[int, int]]:
+        """Find the values that match the string at the position and return their indexes and end positions."""
+
+        char = string[pos:pos + 1]
+        return [(i, pos + len(c)) for i, c in enumerate(self.chars) if c == char or not c]
+
+
+class BytesIntRange(IntRange):
+    """A numerical range yielding byte strings."""
+
+    __slots__ = ()
+
+    def get(self, index: int) -> bytes:  # type: ignore[override]
+        """Get the value at the given index."""
+
+        return b'%0*d' % (self.padding, self.values[index])
+
+    def format(self, values: range) -> Iterator[bytes]:  # type: ignore[override]
+        """Iterate the integers formatted like the node's values."""
+
+        padding = self.padding
+        for value in values:
+            yield b'%0*d' % (padding, value)
+
+
+def encode(node: Node) -> Node:
+    """
+    Get a copy of a node that yields byte strings.
+
+    Text is encoded as Latin-1 and empty slots are yielded as `EMPTY_BYTES`. The copy has the same
+    values in the same positions, so positions found with the original apply to the copy.
+    """
+
+    if isinstance(node, Literal):
+        return type(node)(node.value.encode('latin-1'))  # type: ignore[arg-type]
+    if isinstance(node, Sequence):
+        return BytesSequence(tuple(encode(n) for n in node.items))
+    if isinstance(node, Alternation):
+        return Alternation(tuple(encode(n) for n in node.items))
+    if isinstance(node, IntRange):
+        return BytesIntRange(node.start, node.stop, node.step, node.padding)
+    if isinstance(node, CharRange):
+        chars = copy.copy(node)
+        chars.chars = tuple(c.encode('latin-1') for c in node.chars)  # type: ignore[misc]
+        return chars
+    raise TypeError(f'Unexpected node {node!r}')  # pragma: no cover
+
+
+def clip(values: range, low: int, high: int) -> range:
+    """Get the values of an ascending range from `low` up to, but not including, `high`."""
+
+    start, step = values.start, values.step
+    return values[max(0, -(-(low - start) // step)):max(0, -(-(high - start) // step))]
+
+
+def int_runs(values: range, padding: int) -> list[range]:
+    """
+    Split a range into runs of integers that are in sorted order once formatted.
+
+    Formatted integers of the same sign and length sort like the integers do, except negative integers, which
+    sort like their absolute values.
+    """
+
+    ascending = values if values.step > 0 else values[::-1]
+    largest = max(abs(ascending[0]), abs(ascending[-1]))
+    runs = []
+    for sign, digits in ((-1, padding - 1), (1, padding)):
+        low = 0 if sign > 0 else 1
+        high = 10 ** max(digits, 1)
+        while low <= largest:
+            run = clip(ascending, low, high) if sign > 0 else clip(ascending, 1 - high, 1 - low)[::-1]
+            if run:
+                runs.append(run)
+            low, high = high, high * 10
+    return runs
+
+
+def literal_affix(node: Node, side: int) -> str:
+    """Get the literal text every value of the node starts with (`side` of `0`) or ends with (`side` of `-1`)."""
+
+    if isinstance(node, Sequence):
+        node = node.items[side]
+    return node.value if isinstance(node, Literal) else ''
+
+
+def make_sequence(nodes: Iterable[Node]) -> Node:
+    """Create a sequence, merging adjacent literals and flattening nested sequences."""
+
+    items = []  # type: list[Node]
+    for node in nodes:
+        children = node.items if isinstance(node, Sequence) else (node,)
+        for child in children:
+            if isinstance(child, Literal):
+                if child.value is EMPTY:
+                    continue
+                # Invalid braces are kept apart from the text around them.
+                if type(child) is Literal and items and type(items[-1]) is Literal:
+                    items[-1] = Literal(items[-1].value + child.value)
+                    continue
+            items.append(child)
+
+    if not items:
+        return Literal(EMPTY)
+    return items[0] if len(items) == 1 else Sequence(tuple(items))
+
+
+def make_alternation(nodes: Iterable[Node]) -> Node:
+    """Create an alternation, flattening nested alternations."""
+
+    items = []  # type: list[Node]
+    for node in nodes:
+        if isinstance(node, Alternation):
+            items.extend(node.items)
+        else:
+            items.append(node)
+    return items[0] if len(items) == 1 else Alternation(tuple(items))
+
+
+def size(node: Node) -> int:
+    """Get the total length of all the node's values."""
+
+    if isinstance(node, Literal):
+        return len(node.value)
+
+    if isinstance(node, IntRange):
+        return sum(len(run) * len(node.get(node.values.index(run[0]))) for run in int_runs(node.values, node.padding))
+
+    if isinstance(node, CharRange):
+        return sum(len(c) for c in node.chars)
+
+    if isinstance(node, Sequence):
+        # Each value of a node is joined with every combination of the other nodes' values.
+        return sum(size(n) * (node.count // n.count) for n in node.items)
+
+    if isinstance(node, Alternation):
+        return sum(size(n) for n in node.items)
+
+    raise TypeError(f'Unexpected node {node!r}')  # pragma: no cover
+
+
+def lengths(node: Node) -> tuple[int, int | None, int]:
+    """
+    Get the shortest and longest lengths of the node's values.
+
+    The shortest length of all values (empty slots included) and of the values that are not empty slots (`None`
+    if all values are empty slots) are returned, followed by the longest length.
+    """
+
+    if isinstance(node, Literal):
+        return len(node.value), None if node.empty else len(node.value), len(node.value)
+
+    if isinstance(node, IntRange):
+        widths = [len(node.get(node.values.index(run[0]))) for run in int_runs(node.values, node.padding)]
+        return min(widths), min(widths), max(widths)
+
+    if isinstance(node, CharRange):
+        widths = [len(c) for c in node.chars]
+        return min(widths), min(widths), max(widths)
+
+    found = [lengths(n) for n in node.items]  # type: ignore[attr-defined]
+    if isinstance(node, Sequence):
+        # A value is only an empty slot if all of its parts are.
+        shortest = sum(f[0] for f in found)
+        filled = [shortest - f[0] + f[1] for f in found if f[1] is not None]
+        return shortest, min(filled) if filled else None, sum(f[2] for f in found)
+
+    filled = [f[1] for f in found if f[1] is not None]
+    return min(f[0] for f in found), min(filled) if filled else None, max(f[2] for f in found)
+
+
+def depth(node: Node) -> int:
+    """Get how deeply the node's brace groups are nested."""
+
+    if isinstance(node, Literal):
+        return 0
+    if isinstance(node, Sequence):
+        return max(depth(n) for n in node.items)
+    if isinstance(node, Alternation):
+        return 1 + max(depth(n) for n in node.items)
+    return 1
+
+
+def walk(node: Node) -> Iterator[Node]:
+    """Iterate the node and all the nodes within it."""
+
+    yield node
+    if isinstance(node, (Sequence, Alternation)):
+        for n in node.items:
+            yield from walk(n)
+
+
+def collect(node: Node) -> list[Any]:
+    """
+    Get a list of all the node's values (empty slots included).
+
+    The values of each node are built as lists and joined a node at a time, which is cheaper than iterating
+    a pattern that has few values, but holds them all at once.
+    """
+
+    if isinstance(node, Literal):
+        return [node.value]
+
+    if isinstance(node, Sequence):
+        blank = node.blank
+        values = collect(node.items[0])
+        for n in node.items[1:]:
+            tails = collect(n)
+            values = [b if a is blank else a if b is blank else a + b for a in values for b in tails]
+        return values
+
+    if isinstance(node, Alternation):
+        return [x for n in node.items for x in collect(n)]
+
+    return list(node)
+
+
+def seek(node: Node, index: int) -> int:
+    """
+    Get the position of the non-empty value at index among all values, empty slots included.
+
+    The nodes that make up a value are walked left to right. Until a non-empty piece is found, empty slots
+    must be skipped, but once one is found every remaining combination is a value and the rest of the index
+    maps directly onto the remaining nodes.
+    """
+
+    position = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Sequence):
+            stack.extend(reversed(node.items))
+            continue
+
+        total = math.prod((n.count for n in stack), start=1)
+        if isinstance(node, Alternation):
+            i, index = node.locate(index, total, math.prod((n.empty for n in stack), start=1))
+            position += node.offsets[i] * total
+            stack.append(node.items[i])
+            continue
+
+        if isinstance(node, Literal):
+            if not node.count - node.empty:
+                continue
+        else:
+            i, index = divmod(index, total)
+            position += i * total
+        break
+
+    return position + index
+
+
+def rank(node: Node, string: str) -> int | None:
+    """
+    Get the index of the first non-empty value that equals the string.
+
+    The nodes are matched left to right, backtracking through alternation options and range values in
+    the order they are expanded, so the first full match found is also the one with the lowest index.
+    The index of a match is the sum of the offsets of the options and values chosen along the way.
+    Remaining nodes are kept in linked cells, each storing the total values and empty slots of the
+    nodes from that cell onward. Cells are shared, so the same remaining nodes are always the same cell.
+
+    Whether the remaining nodes match the rest of the string does not depend on how they were reached, so a
+    state that has been searched before, and did not match, is not searched again. This keeps a search that
+    fails within the number of cells times the number of positions, instead of every combination of choices.
+    """
+
+    cells = {}  # type: dict[tuple[int, int], tuple[Any, ...]]
+
+    def cell(node: Node, rest: tuple[Any, ...]) -> tuple[Any, ...]:
+        """Get the cell of remaining nodes."""
+
+        key = (id(node), id(rest))
+        found = cells.get(key)
+        if found is None:
+            found = cells[key] = (node, rest, node.count * rest[2], node.empty * rest[3])
+        return found
+
+    if not string.endswith(literal_affix(node, -1)):
+        return None
+
+    length = len(string)
+    # States already searched: the cell, the position, and whether a non-empty value was found.
+    seen = set()  # type: set[tuple[int, int, bool]]
+    stack = [(cell(node, (None, None, 1, 1)), 0, False, 0)]
+    while stack:
+        current, pos, found, index = stack.pop()
+        state = (id(current), pos, found)
+        if state in seen:
+            continue
+        seen.add(state)
+        while True:
+            node, rest = current[0], current[1]
+            if node is None:
+                if found and pos == length:
+                    return index
+                break
+
+            if isinstance(node, Sequence):
+                for n in reversed(node.items):
+                    rest = cell(n, rest)
+                current = rest
+
+            elif isinstance(node, Literal):
+                if node.value is not EMPTY:
+                    if not string.startswith(node.value, pos):
+                        break
+                    pos += len(node.value)
+                    found = True
+                current = rest
+
+            elif isinstance(node, Alternation):
+                total, empty = rest[2], 0 if found else rest[3]
+                for i in range(len(node.items) - 1, -1, -1):
+                    # Options that start with different literal text are ruled out up front.
+                    if not string.startswith(literal_affix(node.items[i], 0), pos):
+                        continue
+                    offset = node.offsets[i] * total - node.empty_offsets[i] * empty
+                    stack.append((cell(node.items[i], rest), pos, found, index + offset))
+                break
+
+            else:
+                total = rest[2]
+                for i, end in reversed(node.find(string, pos)):
+                    stack.append((rest, end, True, index + i * total))
+                break
+
+    return None
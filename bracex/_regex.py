@@ -0,0 +1,283 @@
+"""
+Translate parsed brace patterns to regular expressions.
+
+Licensed under MIT
+Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+from __future__ import annotations
+import itertools
+import re
+from typing import Iterable
+from ._nodes import EMPTY, Node, Literal, Sequence, Alternation, IntRange, CharRange, literal_affix, rank
+
+# Stepped ranges with more values than this are only translated if the step divides a power of ten.
+MAX_ENUMERATE = 10000
+
+# The largest power of ten that a step is checked against.
+MAX_STEP_DIGITS = 4
+
+_NEVER = '(?!)'
+
+
+def escape_class(char: str) -> str:
+    """Escape a character for use in a character class."""
+
+    return '\\' + char if char in '\\]^-[' else char
+
+
+def char_class(chars: Iterable[str]) -> str:
+    """Create a character class from characters, collapsing runs of consecutive characters into ranges."""
+
+    ordinals = sorted({ord(c) for c in chars})
+    if len(ordinals) == 1:
+        return re.escape(chr(ordinals[0]))
+
+    parts = []
+    i = 0
+    while i < len(ordinals):
+        j = i
+        while j + 1 < len(ordinals) and ordinals[j + 1] == ordinals[j] + 1:
+            j += 1
+        first, last = chr(ordinals[i]), chr(ordinals[j])
+        if j - i > 1:
+            parts.append(f'{escape_class(first)}-{escape_class(last)}')
+        else:
+            parts.extend(escape_class(chr(o)) for o in ordinals[i:j + 1])
+        i = j + 1
+    return '[' + ''.join(parts) + ']'
+
+
+def group(pattern: str) -> str:
+    """Group an alternation so it can be followed by other patterns."""
+
+    depth = 0
+    escaped = False
+    in_class = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and not depth:
+            return f'(?:{pattern})'
+    return pattern
+
+
+class Trie:
+    """
+    A prefix trie of alternatives.
+
+    Literal text is stored character by character so common prefixes are shared, while whatever follows the
+    literal text of an alternative is stored as an already translated pattern.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+
+        self.children = {}  # type: dict[str, Trie]
+        self.tails = {}  # type: dict[str, None]
+
+    def add(self, prefix: str, tail: str = '') -> None:
+        """Add literal text followed by a translated pattern."""
+
+        trie = self
+        for c in prefix:
+            trie = trie.children.setdefault(c, Trie())
+        trie.tails[tail] = None
+
+    def pattern(self) -> str:
+        """Get the pattern for the trie."""
+
+        alternatives = []
+        singles = []
+        for c, child in self.children.items():
+            p = child.pattern()
+            if p:
+                alternatives.append(re.escape(c) + group(p))
+            else:
+                singles.append(c)
+        if singles:
+            alternatives.append(char_class(singles))
+
+        optional = '' in self.tails
+        alternatives.extend(t for t in self.tails if t)
+        if not alternatives:
+            return ''
+
+        p = '|'.join(alternatives)
+        if optional:
+            return f'(?:{p})?' if len(alternatives) > 1 or len(p) > 1 else p + '?'
+        return p
+
+
+def digit_range(low: str, high: str) -> str:
+    """Create a pattern matching every digit string from `low` to `high`, which must be the same length."""
+
+    if low == high:
+        return low
+
+    if len(low) == 1:
+        return char_class(chr(c) for c in range(ord(low), ord(high) + 1))
+
+    if low[0] == high[0]:
+        return low[0] + group(digit_range(low[1:], high[1:]))
+
+    rest = len(low) - 1
+    alternatives = []
+    start, end = low[0], high[0]
+    if low[1:] != '0' * rest:
+        alternatives.append(low[0] + group(digit_range(low[1:], '9' * rest)))
+        start = chr(ord(start) + 1)
+    if high[1:] != '9' * rest:
+        end = chr(ord(end) - 1)
+    if start <= end:
+        alternatives.append(
+            char_class(chr(c) for c in range(ord(start), ord(end) + 1)) + ('[0-9]' if rest == 1 else f'[0-9]{{{rest}}}')
+        )
+    if high[1:] != '9' * rest:
+        alternatives.append(high[0] + group(digit_range('0' * rest, high[1:])))
+    return '|'.join(alternatives)
+
+
+def number_range(low: int, high: int, width: int, suffixes: tuple[str, ...] = ('',)) -> list[str]:
+    """
+    Create patterns matching the formatted integers from `low` to `high`, which must not be negative.
+
+    Numbers shorter than `width` are zero padded. When `suffixes` are given, every number is followed by one
+    of the suffixes, so the digits of the suffixes are expected to already be removed from the numbers.
+    """
+
+    trie = Trie()
+    for suffix in suffixes:
+        trie.add(suffix)
+    tail = group(trie.pattern())
+    patterns = []
+    length = max(width, 1)
+    while low <= high:
+        # Numbers of the current length, the first length holds all the zero padded numbers.
+        end = min(high, 10 ** length - 1)
+        if low <= end:
+            first = f'{low:0{length}d}'
+            last = f'{end:0{length}d}'
+            patterns.append(group(digit_range(first, last)) + tail if tail else digit_range(first, last))
+            low = end + 1
+        length += 1
+    return patterns
+
+
+def int_range(node: IntRange) -> str:
+    """Translate an integer range."""
+
+    low, high = min(node.values[0], node.values[-1]), max(node.values[0], node.values[-1])
+    step = abs(node.values.step)
+    padding = node.padding
+
+    if step == 1:
+        patterns = []  # type: list[str]
+        if low < 0:
+            # A sign counts towards the padding width.
+            patterns.extend(
+                '-' + group(p) for p in number_range(max(-high, 1), -low, max(padding - 1, 0))
+            )
+        if high >= 0:
+            patterns.extend(number_range(max(low, 0), high, padding))
+        return '|'.join(patterns)
+
+    # Values of a step that divides a power of ten can be found by their last digits.
+    digits = next((d for d in range(1, MAX_STEP_DIGITS + 1) if 10 ** d % step == 0), 0)
+    modulus = 10 ** digits
+    values = range(low, high + 1, step)
+
+    trie = Trie()
+    if not digits or low < 0 or high < modulus * 10:
+        if len(values) > MAX_ENUMERATE:
+            raise ValueError(f'Cannot translate a range of {len(values):d} values with a step of {step:d}')
+        for value in values:
+            trie.add(f'{value:0{padding}d}' if padding else str(value))
+        return trie.pattern()
+
+    # Every block of values sharing the same leading digits (excluding the last `digits` digits) ends in one of
+    # the same possible trailing digits. Only values in partial blocks at the edges of the range are listed.
+    suffixes = tuple(f'{t:0{digits}d}' for t in range(low % step, modulus, step))
+    first = -(-max(low, modulus) // modulus)
+    last = (high + 1) // modulus - 1
+    head = values[:len(range(low, first * modulus, step))]
+    tail = values[len(range(low, (last + 1) * modulus, step)):]
+    for value in itertools.chain(head, tail):
+        trie.add(f'{value:0{padding}d}' if padding else str(value))
+
+    patterns = []
+    edges = trie.pattern()
+    if edges:
+        patterns.append(edges)
+    if first <= last:
+        patterns.extend(number_range(first, last, max(padding - digits, 0), suffixes))
+    return '|'.join(patterns)
+
+
+def translate(node: Node) -> str:
+    """Translate a node to a pattern."""
+
+    if isinstance(node, Literal):
+        return re.escape(node.value)
+
+    if isinstance(node, Sequence):
+        return ''.join(group(translate(n)) for n in node.items)
+
+    if isinstance(node, Alternation):
+        trie = Trie()
+        for n in node.items:
+            prefix = literal_affix(n, 0)
+            if isinstance(n, Sequence) and prefix:
+                trie.add(prefix, ''.join(group(translate(i)) for i in n.items[1:]))
+            elif isinstance(n, Literal):
+                trie.add(prefix)
+            else:
+                trie.add('', translate(n))
+        return trie.pattern()
+
+    if isinstance(node, IntRange):
+        return int_range(node)
+
+    if isinstance(node, CharRange):
+        chars = [c for c in node.chars if c]
+        p = char_class(chars)
+        return p + '?' if len(chars) != len(node.chars) else p
+
+    raise TypeError(f'Unexpected node {node!r}')  # pragma: no cover
+
+
+def to_regex(node: Node, return_empty: bool) -> str:
+    """Translate a parsed brace pattern into a regular expression that fully matches each expansion."""
+
+    if node.count == node.empty:
+        return '' if return_empty else _NEVER
+
+    pattern = group(translate(node))
+    # Empty slots are never expanded, so unless an empty value can be produced otherwise, do not match nothing.
+    if node.empty and rank(node, EMPTY) is None:
+        pattern = '(?=[\\s\\S])' + pattern
+    return pattern
+
@@ -0,0 +1,148 @@
+"""
+Expand braces in sorted order.
+
+Licensed under MIT
+Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+from __future__ import annotations
+import heapq
+import itertools
+import math
+from typing import Iterator, Iterable, Callable, Any
+from ._nodes import MAX_CACHED, Node, Literal, Sequence, Alternation, IntRange, CharRange, int_runs
+from ._unique import width
+
+
+def join(prefix: Any, values: Iterable[Any], blank: Any) -> Iterator[Any]:
+    """Join the prefix to each value, keeping empty slots that are joined to empty slots."""
+
+    if prefix is blank:
+        yield from values
+    else:
+        for x in values:
+            yield prefix if x is blank else prefix + x
+
+
+def ordered_product(heads: Iterator[Any], tails: Callable[[], Iterable[Any]], blank: Any) -> Iterator[Any]:
+    """
+    Join each head with each tail in sorted order when the heads are all the same length.
+
+    No head starts with a different head, so the values joined with a head sort before those joined with the
+    heads after it. Only the values of heads that are the same need to be merged.
+    """
+
+    for _, group in itertools.groupby(heads):
+        same = list(group)
+        if len(same) == 1:
+            yield from join(same[0], tails(), blank)
+        else:
+            yield from heapq.merge(*(join(head, tails(), blank) for head in same))
+
+
+def merge_product(heads: Iterator[Any], tails: Callable[[], Iterable[Any]], blank: Any) -> Iterator[Any]:
+    """
+    Merge the values of each head joined with each tail in sorted order.
+
+    A joined value is never less than its head, so heads are visited in sorted order and a head is only joined
+    once the smallest value waiting to be yielded is not less than it. Only heads that start the values waiting to
+    be yielded are held at once.
+    """
+
+    heap = []  # type: list[tuple[Any, int, Iterator[Any]]]
+    order = itertools.count()
+    head = next(heads, None)
+    while True:
+        if head is not None and (not heap or head <= heap[0][0]):
+            stream = join(head, tails(), blank)
+            value = next(stream, None)
+            if value is not None:
+                heapq.heappush(heap, (value, next(order), stream))
+            head = next(heads, None)
+            continue
+
+        if not heap:
+            return
+        value, i, stream = heap[0]
+        yield value
+        value = next(stream, None)
+        if value is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (value, i, stream))
+
+
+def product(items: tuple[Node, ...], blank: Any) -> Iterator[Any]:
+    """
+    Iterate the values of a sequence of nodes in sorted order.
+
+    The sorted values of the first half of the nodes are joined with the sorted values of the second half, so
+    sequences of many nodes are only nested as deep as they can be halved.
+    """
+
+    if len(items) == 1:
+        return sorted_values(items[0], blank)
+
+    half = len(items) // 2
+    heads = product(items[:half], blank)
+    rest = items[half:]
+    if math.prod(n.count for n in rest) <= MAX_CACHED:
+        cached = tuple(product(rest, blank))
+
+        def tails() -> Iterable[Any]:
+            """Get the cached tails."""
+
+            return cached
+
+    else:
+
+        def tails() -> Iterable[Any]:
+            """Get the tails."""
+
+            return product(rest, blank)
+
+    if all(width(n) is not None for n in items[:half]):
+        return ordered_product(heads, tails, blank)
+    return merge_product(heads, tails, blank)
+
+
+def sorted_values(node: Node, blank: Any) -> Iterator[Any]:
+    """
+    Iterate the node's values (empty slots included) in sorted order.
+
+    Ranges are split into runs that are already sorted and merged, the options of an alternation are merged,
+    and the values of a sequence are merged from its nodes' sorted values. Values are generated as they are
+    needed, so no more than the values of small nodes are held at once.
+    """
+
+    if isinstance(node, Literal):
+        return iter((node.value,))
+
+    if isinstance(node, CharRange):
+        return iter(sorted(node.chars))
+
+    if isinstance(node, IntRange):
+        return heapq.merge(*(node.format(run) for run in int_runs(node.values, node.padding)))
+
+    if isinstance(node, Alternation):
+        literals = sorted(n.value for n in node.items if isinstance(n, Literal))
+        streams = [sorted_values(n, blank) for n in node.items if not isinstance(n, Literal)]
+        return heapq.merge(literals, *streams) if streams else iter(literals)
+
+    if isinstance(node, Sequence):
+        return product(node.items, blank)
+
+    raise TypeError(f'Unexpected node {node!r}')  # pragma: no cover
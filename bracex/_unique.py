@@ -0,0 +1,210 @@
+"""
+Remove duplicate expansions.
+
+Licensed under MIT
+Copyright (c) 2018 - 2020 Isaac Muse <isaacmuse@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+from __future__ import annotations
+import itertools
+import math
+from typing import Iterator, Iterable, Any
+from ._nodes import Node, Literal, Sequence, Alternation, IntRange, CharRange, literal_affix, rank
+
+# The most values of an alternation option that are checked one by one against the other options.
+MAX_ENUMERATE = 4096
+
+# The most checks made while proving an alternation has no duplicates before giving up.
+MAX_CHECKS = 100000
+
+# The most hashes a filter uses for each value.
+MAX_HASHES = 16
+
+
+def width(node: Node) -> int | None:
+    """Get the length every value of the node has, or `None` if the values differ in length."""
+
+    if isinstance(node, Literal):
+        return len(node.value)
+
+    if isinstance(node, IntRange):
+        return node.widths[0] if node.widths[0] == node.widths[1] else None
+
+    if isinstance(node, CharRange):
+        return 1 if all(node.chars) else None
+
+    widths = [width(n) for n in node.items]  # type: ignore[attr-defined]
+    if None in widths:
+        return None
+    if isinstance(node, Sequence):
+        return sum(widths)  # type: ignore[arg-type]
+    return widths[0] if len(set(widths)) == 1 else None
+
+
+def affix_free(node: Node, side: int, budget: list[int]) -> bool:
+    """
+    Check that no value of the node starts (`side` of `0`) or ends (`side` of `-1`) with another of its values.
+
+    Values that are the same are not counted, as they are checked for separately.
+    """
+
+    if width(node) is not None:
+        return True
+
+    if isinstance(node, Sequence):
+        return all(affix_free(n, side, budget) for n in node.items)
+
+    if node.count > MAX_ENUMERATE:
+        return False
+    budget[0] -= node.count
+    if budget[0] < 0:
+        return False
+    values = sorted({v if side == 0 else v[::-1] for v in node})
+    return not any(b.startswith(a) for a, b in itertools.pairwise(values))
+
+
+def contains(node: Node, value: str) -> bool:
+    """Check whether the node yields the value, treating empty slots as empty values."""
+
+    return rank(node, value) is not None or (not value and node.empty > 0)
+
+
+def disjoint(a: Node, b: Node, budget: list[int]) -> bool:
+    """Check that two nodes never yield the same value, treating empty slots as empty values."""
+
+    for side in (0, -1):
+        x, y = literal_affix(a, side), literal_affix(b, side)
+        n = min(len(x), len(y))
+        if (x[:n] != y[:n]) if side == 0 else (x[len(x) - n:] != y[len(y) - n:]):
+            return True
+
+    wa, wb = width(a), width(b)
+    if wa is not None and wb is not None and wa != wb:
+        return True
+
+    # Check the values of the smaller node against the other.
+    if a.count > b.count:
+        a, b = b, a
+    if a.count > MAX_ENUMERATE:
+        return False
+    budget[0] -= a.count
+    if budget[0] < 0:
+        return False
+    return not any(contains(b, value) for value in a)
+
+
+def is_unique(node: Node, budget: list[int] | None = None) -> bool:
+    """
+    Check whether the node can be proven to never yield the same value twice.
+
+    Empty slots are treated as empty values as they are joined with other values in a sequence. A value of a
+    sequence can be split back into the values it was made of if, other than one of its nodes, no value of the
+    nodes before that node starts with another value of the same node, and no value of the nodes after it ends
+    with another value of the same node. Options of an alternation are compared by their literal affixes and
+    lengths, and failing that, the values of small options are looked up in the others. The proof gives up when
+    it is too costly, in which case the node is assumed to yield duplicates.
+    """
+
+    if budget is None:
+        budget = [MAX_CHECKS]
+
+    if isinstance(node, (Literal, IntRange, CharRange)):
+        return True
+
+    if isinstance(node, Sequence):
+        if not all(is_unique(n, budget) for n in node.items):
+            return False
+        # The values of the nodes before one of the nodes must be found from the start of the value, and the
+        # values of the nodes after it from the end.
+        items = node.items
+        first = next((i for i, n in enumerate(items) if not affix_free(n, 0, budget)), len(items) - 1)
+        last = next((i for i in range(len(items) - 1, -1, -1) if not affix_free(items[i], -1, budget)), 0)
+        return last <= first
+
+    if isinstance(node, Alternation):
+        literals = set()
+        others = []
+        for n in node.items:
+            if isinstance(n, Literal):
+                if n.value in literals:
+                    return False
+                literals.add(n.value)
+            elif not is_unique(n, budget):
+                return False
+            else:
+                others.append(n)
+
+        budget[0] -= len(others) * (len(others) + len(literals))
+        if budget[0] < 0:
+            return False
+        for i, n in enumerate(others):
+            if any(contains(n, value) for value in literals):
+                return False
+            if not all(disjoint(n, other, budget) for other in others[i + 1:]):
+                return False
+        return True
+
+    raise TypeError(f'Unexpected node {node!r}')  # pragma: no cover
+
+
+def exact(values: Iterable[Any]) -> Iterator[Any]:
+    """Remove duplicates with a set of the values seen so far."""
+
+    seen = set()  # type: set[Any]
+    add = seen.add
+    for value in values:
+        if value not in seen:
+            add(value)
+            yield value
+
+
+def adjacent(values: Iterable[Any]) -> Iterator[Any]:
+    """Remove duplicates from sorted values, where each duplicate follows the value it duplicates."""
+
+    for value, _ in itertools.groupby(values):
+        yield value
+
+
+def filtered(values: Iterable[Any], size: int, total: int) -> Iterator[Any]:
+    """
+    Remove duplicates with a probabilistic filter (a Bloom filter) of `size` bytes.
+
+    Each value sets several bits of the filter found from its hash, and a value is a duplicate if all of its bits
+    are already set. A value that was not seen before can be mistaken for a duplicate, but a duplicate is never
+    missed. The number of bits set for each value is chosen from the size of the filter and the expected number
+    of values.
+    """
+
+    bits = size * 8
+    data = bytearray(size)
+    hashes = range(max(1, min(MAX_HASHES, round(bits / max(total, 1) * math.log(2)))))
+    for value in values:
+        h = hash(value)
+        pos = h % bits
+        step = (h >> 32) % bits | 1
+        new = False
+        for _ in hashes:
+            i = pos >> 3
+            bit = 1 << (pos & 7)
+            byte = data[i]
+            if not byte & bit:
+                data[i] = byte | bit
+                new = True
+            pos += step
+            if pos >= bits:
+                pos -= bits
+        if new:
+            yield value
@@ -10,9 +10,16 @@ import unittest
 import pytest
 import bracex
 import ast
+import asyncio
+import collections
+import concurrent.futures
+import itertools
 import re
 import subprocess
 import textwrap
+import threading
+import time
+import tracemalloc
 
 RE_REMOVE = re.compile(r'^\[|\]$')
 BRE_REMOVE = re.compile(br'^\[|\]$')
@@ -523,3 +530,1222 @@ class TestExpansionLimit(unittest.TestCase):
 
         cp = subprocess.run([sys.executable, "-c", code], capture_output=True, timeout=60)
         assert cp.returncode == 0, f"interpreter crashed: returncode={cp.returncode}"
+
+    def test_max_bytes(self):
+        """Test limiting the total length of the expansions."""
+
+        pattern = 'text{1,2}text{{3,4,{5,6}text{7,8}},{9}}'
+        total = sum(map(len, bracex.expand(pattern)))
+        self.assertEqual(bracex.size(pattern), total)
+        self.assertEqual(len(bracex.expand(pattern, max_bytes=total)), 14)
+        with self.assertRaises(bracex.ExpansionLimitException):
+            bracex.expand(pattern, max_bytes=total - 1)
+        with self.assertRaises(bracex.ExpansionLimitException):
+            bracex.compile(pattern.encode('ascii'), max_bytes=total - 1)
+
+    def test_max_bytes_before_expanding(self):
+        """Test that the total length is checked without expanding."""
+
+        with self.assertRaisesRegex(bracex.ExpansionLimitException, '1143492092887040 characters'):
+            bracex.expand('{a,b}' * 40 + 'x' * 1000, limit=0, max_bytes=10 ** 9)
+
+    def test_size(self):
+        """Test the total length of ranges and empty slots."""
+
+        for pattern in ('{-105..1050..7}', '{-05..05}', '{Z..a}', '{,a}{,bc}{1..12}', '{a,{1..20}}x{,y}', '{,}'):
+            self.assertEqual(bracex.size(pattern), sum(map(len, bracex.expand(pattern, limit=0))), pattern)
+            self.assertEqual(bracex.compile(pattern.encode('ascii'), limit=0).size(), bracex.size(pattern), pattern)
+
+
+class TestCompile(unittest.TestCase):
+    """Test compiled brace patterns."""
+
+    def test_compile_expand(self):
+        """Test that a compiled pattern expands like `expand`."""
+
+        pattern = bracex.compile('file-{{a,b},c}{1..3}.txt')
+        self.assertEqual(pattern.expand(), bracex.expand('file-{{a,b},c}{1..3}.txt'))
+        self.assertEqual(list(pattern.iexpand()), pattern.expand())
+
+    def test_compile_expand_all(self):
+        """Test that expanding everything at once matches expanding one value at a time."""
+
+        for case, _ in get_bash_cases():
+            pattern = bracex.compile(TestBraces.eval_str_esc(case), limit=0)
+            self.assertEqual(pattern.expand(), list(pattern.iexpand()), case)
+
+        # Large patterns are iterated instead of built a node at a time.
+        pattern = bracex.compile('{a,,b}{1..70}{,x,y}{1..20}', limit=0)
+        self.assertEqual(pattern.expand(), list(pattern.iexpand()))
+        pattern = bracex.compile(b'{,}{,}', return_empty=True)
+        self.assertEqual(pattern.expand(), [b''])
+
+    def test_compile_plain(self):
+        """Test that text without braces and groups of plain text parse like any other pattern."""
+
+        self.assertEqual(repr(bracex.parse('a,b}c')), "Literal('a,b}c')")
+        self.assertEqual(bracex.expand('a{b,,c}d'), ['abd', 'ad', 'acd'])
+        self.assertEqual(bracex.expand('{,}x{$,}'), ['x$', 'x', 'x$', 'x'])
+        self.assertEqual(bracex.expand('a{b,c}}'), ['ab}', 'ac}'])
+
+    def test_compile_reuse(self):
+        """Test that a compiled pattern can be expanded more than once."""
+
+        pattern = bracex.compile('{a..c}{1,2}')
+        self.assertEqual(pattern.expand(), ['a1', 'a2', 'b1', 'b2', 'c1', 'c2'])
+        self.assertEqual(pattern.expand(), ['a1', 'a2', 'b1', 'b2', 'c1', 'c2'])
+
+    def test_compile_bytes(self):
+        """Test compiling a bytes pattern."""
+
+        self.assertEqual(bracex.compile(b'{a,b}c').expand(), [b'ac', b'bc'])
+
+    def test_compile_bytes_native(self):
+        """Test that byte string patterns expand straight to byte strings."""
+
+        pattern = '\xe9{-02..2..2}{Z..a..3}{,x}'
+        expected = [v.encode('latin-1') for v in bracex.expand(pattern, limit=0)]
+        compiled = bracex.compile(pattern.encode('latin-1'), limit=0)
+        for values in (compiled.expand(), compiled.expand(3, -3), [compiled[i] for i in range(len(compiled))]):
+            self.assertTrue(all(type(v) is bytes for v in values))
+        self.assertEqual(compiled.expand(), expected)
+        self.assertEqual(compiled.expand(3, -3), expected[3:-3])
+        self.assertEqual([compiled[i] for i in range(len(compiled))], expected)
+
+    def test_compile_options(self):
+        """Test that options are applied by the compiled pattern."""
+
+        self.assertEqual(bracex.compile('{,,}', return_empty=True).expand(), [''])
+        self.assertEqual(bracex.compile('{,,}').expand(), [])
+        self.assertEqual(bracex.compile(r'\{a,b}', keep_escapes=True).expand(), [r'\{a,b}'])
+
+    def test_compile_limit(self):
+        """Test that the limit is enforced when compiling."""
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            bracex.compile('{1..11}', limit=10)
+
+    def test_compile_immutable(self):
+        """Test that compiled patterns are immutable and hashable."""
+
+        pattern = bracex.compile('{a,b}')
+        with self.assertRaises(AttributeError):
+            pattern.limit = 0
+        self.assertEqual(pattern, bracex.compile('{a,b}'))
+        self.assertNotEqual(pattern, bracex.compile('{a,b}', limit=0))
+        self.assertEqual(hash(pattern), hash(bracex.compile('{a,b}')))
+
+
+class TestCache(unittest.TestCase):
+    """Test the pattern cache."""
+
+    def setUp(self):
+        """Setup."""
+
+        bracex.purge()
+
+    def tearDown(self):
+        """Teardown."""
+
+        bracex.set_cache_size(bracex.DEFAULT_CACHE_SIZE)
+        bracex.purge()
+
+    def test_cache_hits(self):
+        """Test that repeated expansions of a pattern are not parsed again."""
+
+        bracex.expand('{a,b}')
+        bracex.expand('{a,b}')
+        list(bracex.iexpand('{a,b}'))
+        info = bracex.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.currsize, 1)
+        self.assertIs(bracex.compile('{a,b}'), bracex.compile('{a,b}'))
+
+    def test_cache_key(self):
+        """Test that options and string type are part of the cache key."""
+
+        bracex.expand('{a,b}')
+        bracex.expand(b'{a,b}')
+        bracex.expand('{a,b}', keep_escapes=True)
+        bracex.expand('{a,b}', limit=0)
+        bracex.expand('{a,b}', return_empty=True)
+        info = bracex.cache_info()
+        self.assertEqual(info.misses, 5)
+        self.assertEqual(info.hits, 0)
+
+    def test_cache_evictions(self):
+        """Test that the least recently used pattern is evicted."""
+
+        bracex.set_cache_size(2)
+        bracex.expand('{a,b}')
+        bracex.expand('{c,d}')
+        bracex.expand('{a,b}')
+        bracex.expand('{e,f}')
+        bracex.expand('{a,b}')
+        bracex.expand('{c,d}')
+        info = bracex.cache_info()
+        self.assertEqual(info.hits, 2)
+        self.assertEqual(info.misses, 4)
+        self.assertEqual(info.evictions, 2)
+        self.assertEqual(info.currsize, 2)
+        self.assertEqual(info.maxsize, 2)
+
+    def test_cache_resize(self):
+        """Test that shrinking the cache evicts patterns."""
+
+        for x in range(5):
+            bracex.expand(f'{{a,b}}{x}')
+        bracex.set_cache_size(3)
+        info = bracex.cache_info()
+        self.assertEqual(info.currsize, 3)
+        self.assertEqual(info.evictions, 2)
+
+    def test_cache_disabled(self):
+        """Test that a cache size of zero disables caching."""
+
+        bracex.set_cache_size(0)
+        bracex.expand('{a,b}')
+        bracex.expand('{a,b}')
+        info = bracex.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.currsize, 0)
+
+    def test_purge(self):
+        """Test purging the cache."""
+
+        bracex.expand('{a,b}')
+        bracex.purge()
+        self.assertEqual(bracex.cache_info(), bracex.CacheInfo(0, 0, 0, bracex.DEFAULT_CACHE_SIZE, 0))
+
+    def test_limit_not_cached(self):
+        """Test that patterns exceeding the limit are not cached."""
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            bracex.expand('{1..11}', limit=10)
+        self.assertEqual(bracex.cache_info().currsize, 0)
+
+
+class TestCount(unittest.TestCase):
+    """Test counting expansions."""
+
+    def test_count_bash_cases(self):
+        """Test that counts match the number of expansions."""
+
+        for case, _ in get_bash_cases():
+            pattern = TestBraces.eval_str_esc(case)
+            self.assertEqual(bracex.count(pattern), len(bracex.expand(pattern, limit=0)), pattern)
+            self.assertEqual(
+                bracex.count(pattern, return_empty=True),
+                len(bracex.expand(pattern, limit=0, return_empty=True)),
+                pattern
+            )
+
+    def test_count_empty(self):
+        """Test that empty slots are not counted."""
+
+        self.assertEqual(bracex.count('{,,}'), 0)
+        self.assertEqual(bracex.count('{,,}', return_empty=True), 1)
+        self.assertEqual(bracex.count(''), 0)
+        self.assertEqual(bracex.count('-v{,,,,}'), 5)
+        self.assertEqual(bracex.count('{,a}{,b}'), 3)
+        self.assertEqual(bracex.count('{Z..a}'), 8)
+
+    def test_count_ignores_limit(self):
+        """Test that counting is not restricted by the limit."""
+
+        self.assertEqual(bracex.count('{1..1000000}{a..z}{0..9}'), 260000000)
+        self.assertEqual(bracex.count(b'{1..1000000}{a..z}{0..9}'), 260000000)
+
+    def test_len(self):
+        """Test the length of a compiled pattern."""
+
+        self.assertEqual(len(bracex.compile('a{1..3}b{c,d,}')), 9)
+        self.assertEqual(bracex.compile('a{1..3}b{c,d,}').count(), 9)
+
+
+class TestNth(unittest.TestCase):
+    """Test random access to expansions."""
+
+    def test_nth_bash_cases(self):
+        """Test that every index matches the expansion at that position."""
+
+        for case, _ in get_bash_cases():
+            pattern = TestBraces.eval_str_esc(case)
+            expansions = bracex.expand(pattern, limit=0)
+            compiled = bracex.compile(pattern, limit=0)
+            for index in range(-len(expansions), len(expansions)):
+                self.assertEqual(compiled[index], expansions[index], pattern)
+
+    def test_nth_empty_slots(self):
+        """Test that empty slots are skipped."""
+
+        pattern = '{,a,}{,{,b},}{c,}'
+        expansions = bracex.expand(pattern)
+        for index, expansion in enumerate(expansions):
+            self.assertEqual(bracex.nth(pattern, index), expansion)
+
+    def test_nth_large(self):
+        """Test indexing a pattern that is too large to expand."""
+
+        pattern = 'shard{0000..9999}-{a..z}-{1..500}'
+        self.assertEqual(bracex.nth(pattern, 48211907), 'shard3708-p-408')
+        self.assertEqual(bracex.nth(pattern, -1), 'shard9999-z-500')
+        self.assertEqual(bracex.nth(pattern.encode('ascii'), 0), b'shard0000-a-1')
+
+    def test_nth_out_of_range(self):
+        """Test indexes that are out of range."""
+
+        with self.assertRaises(IndexError):
+            bracex.nth('{a,b}', 2)
+        with self.assertRaises(IndexError):
+            bracex.nth('{a,b}', -3)
+        with self.assertRaises(IndexError):
+            bracex.nth('{,}', 0)
+        with self.assertRaises(TypeError):
+            bracex.nth('{a,b}', 1.0)
+
+    def test_nth_return_empty(self):
+        """Test indexing with `return_empty`."""
+
+        self.assertEqual(bracex.nth('{,}', 0, return_empty=True), '')
+        self.assertEqual(bracex.nth(b'{,}', -1, return_empty=True), b'')
+
+
+class TestIndexOf(unittest.TestCase):
+    """Test finding the index of an expansion."""
+
+    def test_index_of_bash_cases(self):
+        """Test that the index of every expansion is its first position."""
+
+        for case, _ in get_bash_cases():
+            pattern = TestBraces.eval_str_esc(case)
+            expansions = bracex.expand(pattern, limit=0)
+            for expansion in expansions:
+                self.assertEqual(bracex.index_of(pattern, expansion), expansions.index(expansion), pattern)
+
+    def test_index_of_ranges(self):
+        """Test padded, stepped, negative, and ambiguous ranges."""
+
+        for pattern in (
+            'host{01..64}.rack{a..h}',
+            '{-05..10..3}{1,11}',
+            '{1..20}{0..9}',
+            '{-10..10}{-1..1}',
+            '{Z..a}x',
+            '{k..a..3}{1..3}'
+        ):
+            expansions = bracex.expand(pattern, limit=0)
+            for expansion in expansions:
+                self.assertEqual(bracex.index_of(pattern, expansion), expansions.index(expansion), pattern)
+
+    def test_index_of_nested(self):
+        """Test nested alternations with empty slots and duplicates."""
+
+        pattern = '{,a,}{,{,b},a}{c,}'
+        expansions = bracex.expand(pattern)
+        for expansion in expansions:
+            self.assertEqual(bracex.index_of(pattern, expansion), expansions.index(expansion))
+
+    def test_index_of_missing(self):
+        """Test values that are not expanded."""
+
+        self.assertIsNone(bracex.index_of('host{01..64}.rack{a..h}', 'host65.racka'))
+        self.assertIsNone(bracex.index_of('host{01..64}.rack{a..h}', 'host1.racka'))
+        self.assertIsNone(bracex.index_of('{1..10..2}', '4'))
+        self.assertIsNone(bracex.index_of('{,}', ''))
+        self.assertIsNone(bracex.index_of('a{b,c}', 'a'))
+
+    def test_index_of_large(self):
+        """Test finding a value in a pattern that is too large to expand."""
+
+        pattern = 'shard{0000..9999}-{a..z}-{1..500}'
+        self.assertEqual(bracex.index_of(pattern, 'shard3708-p-408'), 48211907)
+        self.assertEqual(bracex.index_of(pattern.encode('ascii'), b'shard9999-z-500'), 129999999)
+
+    def test_index_of_ambiguous(self):
+        """Test values that many combinations of options could start, but only a few can finish."""
+
+        pattern = '{a,aa}' * 40 + 'b'
+        self.assertEqual(bracex.index_of(pattern, 'a' * 80 + 'b'), 2 ** 40 - 1)
+        self.assertEqual(bracex.index_of(pattern, 'a' * 79 + 'b'), 2 ** 39 - 1)
+        self.assertIsNone(bracex.index_of(pattern, 'a' * 81 + 'b'))
+
+        pattern = '{a,aa}' * 6 + '{b,c}'
+        expansions = bracex.expand(pattern, limit=0)
+        for expansion in expansions:
+            self.assertEqual(bracex.index_of(pattern, expansion), expansions.index(expansion))
+
+    def test_index_of_return_empty(self):
+        """Test the empty value with `return_empty`."""
+
+        self.assertEqual(bracex.index_of('{,}', '', return_empty=True), 0)
+
+    def test_index_of_type_mismatch(self):
+        """Test that a value must be the same type as the pattern."""
+
+        with self.assertRaises(TypeError):
+            bracex.index_of('{a,b}', b'a')
+
+
+class TestSlice(unittest.TestCase):
+    """Test expanding slices and shards."""
+
+    def test_slice_bash_cases(self):
+        """Test that slices match slicing the full expansion."""
+
+        for case, _ in get_bash_cases():
+            pattern = TestBraces.eval_str_esc(case)
+            expansions = bracex.expand(pattern, limit=0)
+            for start, stop in ((1, None), (None, -1), (2, 5), (-3, None), (5, 2)):
+                self.assertEqual(
+                    bracex.expand(pattern, limit=0, start=start, stop=stop),
+                    expansions[start:stop],
+                    pattern
+                )
+
+    def test_slice_empty_slots(self):
+        """Test slicing when empty slots must be skipped."""
+
+        pattern = '{,a,}{,{,b},a}{c,}'
+        expansions = bracex.expand(pattern)
+        for start in range(len(expansions)):
+            self.assertEqual(bracex.expand(pattern, start=start), expansions[start:])
+
+    def test_slice_return_empty(self):
+        """Test slicing with `return_empty`."""
+
+        self.assertEqual(bracex.expand('{,}', return_empty=True, start=0, stop=1), [''])
+        self.assertEqual(bracex.expand('{,}', return_empty=True, start=1), [])
+
+    def test_shards(self):
+        """Test that shards are disjoint and together cover the expansion in order."""
+
+        pattern = 'item{1..10}{a,b,c}'
+        expansions = bracex.expand(pattern)
+        for n in range(1, 8):
+            shards = [bracex.expand(pattern, shard=(k, n)) for k in range(n)]
+            self.assertEqual([x for s in shards for x in s], expansions)
+            self.assertLessEqual(max(len(s) for s in shards) - min(len(s) for s in shards), 1)
+
+    def test_shard_of_slice(self):
+        """Test sharding a slice."""
+
+        pattern = bracex.compile('{1..100}')
+        self.assertEqual(pattern.expand(10, 20, shard=(1, 2)), [str(x) for x in range(16, 21)])
+
+    def test_shard_large(self):
+        """Test that a shard seeks directly into a pattern that is too large to expand."""
+
+        pattern = bracex.compile('shard{0000..9999}-{a..z}-{1..500}', limit=0)
+        self.assertEqual(next(pattern.iexpand(shard=(7, 8))), 'shard8750-a-1')
+        self.assertEqual(pattern.expand(-5, -3), ['shard9999-z-496', 'shard9999-z-497'])
+        self.assertEqual(pattern.expand(48211907, 48211909), ['shard3708-p-408', 'shard3708-p-409'])
+
+    def test_invalid_shard(self):
+        """Test invalid shards."""
+
+        with self.assertRaises(ValueError):
+            bracex.expand('{a,b}', shard=(2, 2))
+        with self.assertRaises(ValueError):
+            bracex.expand('{a,b}', shard=(0, 0))
+
+
+class TestMatch(unittest.TestCase):
+    """Test checking if a value is expanded by a pattern."""
+
+    def test_match(self):
+        """Test matching values."""
+
+        pattern = 'svc-{api,web,worker}-{001..500}.{eu,us}'
+        self.assertTrue(bracex.match(pattern, 'svc-worker-317.us'))
+        self.assertTrue(bracex.match(pattern, 'svc-api-001.eu'))
+        self.assertFalse(bracex.match(pattern, 'svc-worker-317.uk'))
+        self.assertFalse(bracex.match(pattern, 'svc-web-501.eu'))
+        self.assertFalse(bracex.match(pattern, 'svc-web-17.eu'))
+        self.assertFalse(bracex.match(pattern, 'db-api-001.eu'))
+
+    def test_match_ranges(self):
+        """Test matching stepped and character ranges."""
+
+        self.assertTrue(bracex.match('{1..99..2}', '37'))
+        self.assertFalse(bracex.match('{1..99..2}', '38'))
+        self.assertFalse(bracex.match('{1..99..2}', '037'))
+        self.assertTrue(bracex.match('{-10..010..5}', '-05'))
+        self.assertFalse(bracex.match('{-10..010..5}', '-5'))
+        self.assertTrue(bracex.match('x{a..z..5}', 'xk'))
+        self.assertFalse(bracex.match('x{a..z..5}', 'xl'))
+
+    def test_match_empty(self):
+        """Test matching empty values."""
+
+        self.assertFalse(bracex.match('{,}', ''))
+        self.assertTrue(bracex.match('{,}', '', return_empty=True))
+        self.assertTrue(bracex.match('{Z..a}', ''))
+
+    def test_match_ambiguous_miss(self):
+        """Test that a miss with many ways to match each group does not try every combination."""
+
+        pattern = '{a,aa}' * 40 + 'b'
+        self.assertFalse(bracex.match(pattern, 'a' * 81 + 'b'))
+        self.assertFalse(bracex.match(pattern, 'a' * 60 + 'c' + 'a' * 19 + 'b'))
+        self.assertTrue(bracex.match(pattern, 'a' * 80 + 'b'))
+        self.assertFalse(bracex.match('{1..99}' * 30 + 'x', '1' * 70))
+
+    def test_contains(self):
+        """Test the `in` operator on a compiled pattern."""
+
+        pattern = bracex.compile(b'host{01..64}.rack{a..h}')
+        self.assertIn(b'host17.rackc', pattern)
+        self.assertNotIn(b'host17.racki', pattern)
+        with self.assertRaises(TypeError):
+            'host17.rackc' in pattern  # noqa: B015
+
+
+class TestRegex(unittest.TestCase):
+    """Test translating patterns to regular expressions."""
+
+    def assert_translated(self, pattern, candidates=(), return_empty=False):
+        """Assert the regular expression matches exactly the expansions."""
+
+        expansions = set(bracex.expand(pattern, limit=0, return_empty=return_empty))
+        regex = re.compile(bracex.to_regex(pattern, return_empty=return_empty))
+        for value in expansions | set(candidates):
+            self.assertEqual(bool(regex.fullmatch(value)), value in expansions, (pattern, value, regex.pattern))
+
+    def test_regex_bash_cases(self):
+        """Test that the regular expression matches every expansion."""
+
+        for case, _ in get_bash_cases():
+            pattern = TestBraces.eval_str_esc(case)
+            self.assert_translated(pattern, ('', 'a', '{', '1'))
+
+    def test_regex_ranges(self):
+        """Test padded, stepped, and negative ranges."""
+
+        candidates = [str(i) for i in range(-1200, 1200)] + ['{:04d}'.format(i) for i in range(-120, 1200)]
+        for pattern in (
+            '{1..1000}',
+            '{0001..1100}',
+            '{-05..10}',
+            '{-100..-3}',
+            '{0..1000..10}',
+            '{1000..7..-5}',
+            '{-12..1100..25}',
+            '{3..500..3}',
+            '{010..1000..100}'
+        ):
+            self.assert_translated(pattern, candidates)
+
+    def test_regex_factored(self):
+        """Test that common prefixes and numeric ranges are factored."""
+
+        self.assertEqual(bracex.to_regex('host{01..64}.rack{a..h}'), r'host(?:0[1-9]|[1-5][0-9]|6[0-4])\.rack[a-h]')
+        self.assertEqual(bracex.to_regex('{api,app,web}'), '(?:ap[ip]|web)')
+        self.assertLess(len(bracex.to_regex('{1..100000}{0..100000..50}')), 200)
+
+    def test_regex_empty(self):
+        """Test patterns with empty expansions."""
+
+        self.assert_translated('{,}', ('', 'a'))
+        self.assert_translated('{,}', ('', 'a'), return_empty=True)
+        self.assert_translated('{,a}', ('', 'a'))
+        self.assert_translated('{Z..a}', ('', '\\', 'a'))
+
+    def test_regex_bytes(self):
+        """Test translating a byte string."""
+
+        self.assertEqual(bracex.to_regex(b'{a,b}c'), b'[ab]c')
+
+    def test_regex_too_large(self):
+        """Test that stepped ranges which would list too many values fail."""
+
+        with self.assertRaises(ValueError):
+            bracex.to_regex('{1..1000000..3}')
+
+
+class TestCompress(unittest.TestCase):
+    """Test compressing strings into braces."""
+
+    def assert_round_trip(self, items):
+        """Assert the compressed pattern expands to the items."""
+
+        pattern = bracex.compress(items)
+        self.assertEqual(bracex.expand(pattern, limit=0), items, pattern)
+        return pattern
+
+    def test_compress_bash_cases(self):
+        """Test that the expansions of the bash cases round trip."""
+
+        for case, _ in get_bash_cases():
+            expansions = [e for e in bracex.expand(TestBraces.eval_str_esc(case), limit=0) if e]
+            if expansions:
+                self.assert_round_trip(expansions)
+
+    def test_compress_products(self):
+        """Test that products of ranges and alternatives are found."""
+
+        for pattern in (
+            'host{01..64}.rack{a..h}',
+            'svc-{api,worker}-{001..500}.{eu,us}',
+            'n{-10..10..5}{A..Y..3}'
+        ):
+            self.assertEqual(self.assert_round_trip(bracex.expand(pattern, limit=0)), pattern)
+
+    def test_compress_runs(self):
+        """Test integer and letter runs."""
+
+        self.assertEqual(self.assert_round_trip(['web1', 'web2', 'web3', 'db1', 'db2']), '{web{1..3},db{1,2}}')
+        self.assertEqual(self.assert_round_trip(['8', '9', '10', '11', 'x']), '{{8..11},x}')
+        self.assertEqual(self.assert_round_trip(['08', '09', '10']), '{08..10}')
+        self.assert_round_trip(['8', '9', '010', '011', '012'])
+        self.assertEqual(self.assert_round_trip(['a', 'c', 'e', 'g', 'Z']), '{{a..g..2},Z}')
+
+    def test_compress_unordered(self):
+        """Test that order and duplicates are kept."""
+
+        self.assertEqual(self.assert_round_trip(['a', 'a', 'a']), 'a{,,}')
+        self.assert_round_trip(['3', '1', '2', '1', 'b', 'a'])
+
+    def test_compress_escapes(self):
+        """Test that special characters are escaped."""
+
+        self.assertEqual(self.assert_round_trip(['a{1,2}', 'a$', 'a\\']), 'a{\\{1\\,2\\},\\$,\\\\}')
+        self.assert_round_trip(['${x}1', '${x}2', '${x}3'])
+
+    def test_compress_bytes(self):
+        """Test compressing byte strings."""
+
+        self.assertEqual(bracex.compress([b'n1', b'n2', b'n3']), b'n{1..3}')
+
+    def test_compress_large(self):
+        """Test compressing a large number of strings."""
+
+        items = ['node{:06d}.{}'.format(i, dc) for i in range(50000) for dc in ('eu', 'us')]
+        self.assertEqual(self.assert_round_trip(items), 'node0{00000..49999}.{eu,us}')
+
+    def test_compress_invalid(self):
+        """Test strings that cannot be compressed."""
+
+        with self.assertRaises(ValueError):
+            bracex.compress([])
+        with self.assertRaises(ValueError):
+            bracex.compress(['a', ''])
+        with self.assertRaises(TypeError):
+            bracex.compress(['a', b'b'])
+
+
+class TestParallel(unittest.TestCase):
+    """Test expanding across a pool of processes."""
+
+    def test_parallel_ordered(self):
+        """Test that chunks are yielded in order."""
+
+        pattern = 'n{1..20}{a..e}{0..9}'
+        self.assertEqual(
+            list(bracex.expand_parallel(pattern, limit=0, workers=2, chunksize=37)),
+            bracex.expand(pattern, limit=0)
+        )
+
+    def test_parallel_unordered(self):
+        """Test that all chunks are yielded when unordered."""
+
+        pattern = b'n{1..20}{a..e}{0..9}'
+        self.assertEqual(
+            sorted(bracex.expand_parallel(pattern, limit=0, workers=2, chunksize=37, ordered=False)),
+            sorted(bracex.expand(pattern, limit=0))
+        )
+
+    def test_parallel_single_chunk(self):
+        """Test patterns that fit in a single chunk."""
+
+        self.assertEqual(list(bracex.expand_parallel('{a,b}{1..3}', workers=2)), bracex.expand('{a,b}{1..3}'))
+        self.assertEqual(list(bracex.expand_parallel('{,}', return_empty=True, workers=2)), [''])
+
+    def test_parallel_limit(self):
+        """Test that the limit is checked before any work is done."""
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            list(bracex.expand_parallel('{1..10}{1..10}', limit=50, workers=2))
+
+    def test_parallel_chunksize(self):
+        """Test an invalid chunk size."""
+
+        with self.assertRaises(ValueError):
+            list(bracex.expand_parallel('{a,b}', chunksize=0))
+
+
+class TestChunks(unittest.TestCase):
+    """Test expanding into lists of expansions."""
+
+    def assert_chunks(self, pattern, size, **kwargs):
+        """Assert that the chunks are full and hold the expansions in order."""
+
+        chunks = list(bracex.iexpand_chunks(pattern, size, **kwargs))
+        self.assertTrue(all(len(c) == size for c in chunks[:-1]))
+        self.assertTrue(0 < len(chunks[-1]) <= size if chunks else True)
+        kwargs.setdefault('limit', 0)
+        self.assertEqual([x for c in chunks for x in c], bracex.expand(pattern, **kwargs))
+
+    def test_chunks(self):
+        """Test chunks of different sizes."""
+
+        self.assertEqual(
+            list(bracex.iexpand_chunks('file{1..5}.txt', 2)),
+            [['file1.txt', 'file2.txt'], ['file3.txt', 'file4.txt'], ['file5.txt']]
+        )
+        for size in (1, 3, 1000, 5000, 10000):
+            self.assert_chunks('{a..z}{1..300}x', size, limit=0)
+            self.assert_chunks(b'{a,b}{1..6000}', size, limit=0)
+
+    def test_chunks_empty(self):
+        """Test that empty slots are skipped."""
+
+        self.assert_chunks('{,a}{,b}{,{1..5000}}', 7, limit=0)
+        self.assert_chunks('{,}', 7, return_empty=True)
+        self.assert_chunks('{,}', 7)
+
+    def test_chunks_options(self):
+        """Test chunks of slices, unique, and sorted expansions."""
+
+        self.assert_chunks('{1..20}{a..c}', 4, start=5, stop=-7)
+        self.assert_chunks('{1..20}{a..c}', 4, shard=(1, 3))
+        self.assert_chunks('{b,a,b}{1..20}', 4, unique=True)
+        self.assert_chunks('{b,a,b}{1..20}', 4, sort=True, unique=True)
+        self.assert_chunks('{1..20}{a..c}', 4, start=100, stop=10)
+
+    def test_chunks_errors(self):
+        """Test invalid sizes, limits, and cancellation."""
+
+        with self.assertRaises(ValueError):
+            list(bracex.iexpand_chunks('{a,b}', 0))
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            list(bracex.iexpand_chunks('{1..10}{1..10}', 10, limit=10))
+
+        token = bracex.CancellationToken()
+        chunks = bracex.iexpand_chunks('{1..100}{1..100}', 10, limit=0, cancel=token)
+        next(chunks)
+        token.cancel()
+        with self.assertRaises(bracex.ExpansionCancelledException):
+            list(chunks)
+
+
+class TestExpandMany(unittest.TestCase):
+    """Test expanding many patterns at once."""
+
+    def test_expand_many(self):
+        """Test expanding patterns keyed by pattern."""
+
+        patterns = ['{a,b}{1..3}', b'x{1,2}', '{,}', '{a,b}{1..3}', 'plain']
+        self.assertEqual(
+            bracex.expand_many(patterns),
+            {p: bracex.expand(p) for p in patterns}
+        )
+
+    def test_iexpand_many_order(self):
+        """Test that patterns are yielded in order with duplicates."""
+
+        patterns = ['{1..3}', 'a{b,c}', '{1..3}', '{,}'] * 3
+        results = list(bracex.iexpand_many(patterns, return_empty=True, batchsize=5))
+        self.assertEqual(results, [(p, bracex.expand(p, return_empty=True)) for p in patterns])
+
+    def test_iexpand_many_stream(self):
+        """Test that expansions are not held once they are yielded and are no longer recent."""
+
+        patterns = (f'p{i}-{{1..100}}' for i in range(2000))
+        tracemalloc.start()
+        try:
+            total = sum(len(values) for _, values in bracex.iexpand_many(patterns, batchsize=50))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(total, 200000)
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+    def test_iexpand_many_recent(self):
+        """Test that recent repeated patterns share their expansions and older ones are expanded again."""
+
+        patterns = ['a{1,2}', 'b', 'c', 'a{1,2}', 'd', 'e', 'f', 'g', 'a{1,2}']
+        results = list(bracex.iexpand_many(patterns, batchsize=2))
+        self.assertEqual(results, [(p, bracex.expand(p)) for p in patterns])
+        self.assertIs(results[0][1], results[3][1])
+        self.assertIsNot(results[3][1], results[8][1])
+
+    def test_expand_many_executor(self):
+        """Test expanding patterns across a pool."""
+
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        patterns = ['h{1..20}.{a..c}', 'n{01..09}', 'x{y,z}', 'h{1..20}.{a..c}'] * 20
+        expected = [(p, bracex.expand(p)) for p in patterns]
+        for cls in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with cls(2) as executor:
+                self.assertEqual(list(bracex.iexpand_many(patterns, executor=executor, batchsize=3)), expected)
+
+    def test_expand_many_limit(self):
+        """Test that each pattern is held to the limit."""
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            bracex.expand_many(['{1..3}', '{1..10}{1..10}'], limit=50)
+
+    def test_expand_many_batchsize(self):
+        """Test an invalid batch size."""
+
+        with self.assertRaises(ValueError):
+            bracex.expand_many(['{a,b}'], batchsize=0)
+
+
+class TestEngine(unittest.TestCase):
+    """Test the expansion engine."""
+
+    def test_many_groups(self):
+        """Test a sequence of many brace groups."""
+
+        pattern = '{a,b}' * 16
+        expansions = bracex.expand(pattern, limit=0)
+        self.assertEqual(len(expansions), 2 ** 16)
+        self.assertEqual(expansions[0], 'a' * 16)
+        self.assertEqual(expansions[-1], 'b' * 16)
+        self.assertEqual(expansions[12345], bracex.nth(pattern, 12345))
+
+    def test_large_groups(self):
+        """Test brace groups with more values than are kept while iterating."""
+
+        pattern = '{a,b}{1..5000}{,x}'
+        expansions = bracex.expand(pattern, limit=0)
+        self.assertEqual(len(expansions), 20000)
+        self.assertEqual(expansions[:3], ['a1', 'a1x', 'a2'])
+        self.assertEqual(expansions[-1], 'b5000x')
+        self.assertEqual(bracex.compile(pattern, limit=0).expand(9999, 10002), ['a5000x', 'b1', 'b1x'])
+
+    def test_empty_slots(self):
+        """Test sequences of empty slots."""
+
+        self.assertEqual(bracex.expand('{,}{,}{,a}'), ['a', 'a', 'a', 'a'])
+        self.assertEqual(bracex.expand('{,b}{,}{,a}'), ['a', 'a', 'b', 'ba', 'b', 'ba'])
+
+    def test_trailing_literal(self):
+        """Test literal text following the last brace group."""
+
+        self.assertEqual(bracex.expand('{a,}{1..3}.log'), ['a1.log', 'a2.log', 'a3.log', '1.log', '2.log', '3.log'])
+        self.assertEqual(bracex.expand('{a,}{,}.log'), ['a.log', 'a.log', '.log', '.log'])
+        self.assertEqual(bracex.compile('{a,}{1..3}.log').expand(2, 4), ['a3.log', '1.log'])
+
+    def test_long_literals(self):
+        """Test long runs of literal text around special characters."""
+
+        a, b = 'a' * 5000, 'b' * 5000
+        self.assertEqual(
+            bracex.expand(a + '\\{' + b + '${c,d}' + '{e,f}' + a + ',}'),
+            [a + '{' + b + '${c,d}e' + a + ',}', a + '{' + b + '${c,d}f' + a + ',}']
+        )
+        self.assertEqual(bracex.expand('{' + a + ',' + b + '}'), [a, b])
+
+    def test_large_range_memory(self):
+        """Test that expanding a huge range does not hold its values in memory."""
+
+        pattern = bracex.compile('item{1..50000000}.{x,y}', limit=0)
+        tracemalloc.start()
+        try:
+            self.assertEqual(list(itertools.islice(pattern.iexpand(), 3)), ['item1.x', 'item1.y', 'item2.x'])
+            collections.deque(itertools.islice(pattern.iexpand(), 100000), 0)
+            self.assertEqual(pattern.expand(99999997, None), ['item49999999.y', 'item50000000.x', 'item50000000.y'])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_node_sequence(self):
+        """Test that nodes can be measured and indexed like sequences."""
+
+        node = bracex.parse('{a,b}{1..50000000}')
+        self.assertEqual(len(node), 100000000)
+        self.assertEqual(node[0], 'a1')
+        self.assertEqual(node[-1], 'b50000000')
+        self.assertEqual(node.items[1][-2], '49999999')
+        with self.assertRaises(IndexError):
+            node[100000000]
+
+
+class TestParse(unittest.TestCase):
+    """Test parsing patterns into nodes."""
+
+    def test_nodes(self):
+        """Test the nodes of a pattern."""
+
+        node = bracex.parse('web{01..10..3}.{eu,us}{a..e..2}')
+        self.assertIsInstance(node, bracex.Sequence)
+        self.assertEqual(node.count, 4 * 2 * 3)
+        literal, ints, dot, alternation, chars = node.items
+        self.assertEqual(literal.value, 'web')
+        self.assertIsInstance(ints, bracex.IntRange)
+        self.assertEqual((ints.start, ints.stop, ints.step, ints.padding, ints.count), (1, 10, 3, 2, 4))
+        self.assertEqual(dot.value, '.')
+        self.assertIsInstance(alternation, bracex.Alternation)
+        self.assertEqual([n.value for n in alternation.items], ['eu', 'us'])
+        self.assertIsInstance(chars, bracex.CharRange)
+        self.assertEqual(chars.chars, ('a', 'c', 'e'))
+        self.assertEqual(list(node), bracex.expand('web{01..10..3}.{eu,us}{a..e..2}'))
+
+    def test_invalid_braces(self):
+        """Test braces that do not form a group."""
+
+        node = bracex.parse('{{a},b}{c,d')
+        self.assertEqual(
+            [(type(n), n.value) for n in node.items[0].items[0].items],
+            [(bracex.InvalidBrace, '{'), (bracex.Literal, 'a'), (bracex.InvalidBrace, '}')]
+        )
+        self.assertEqual(
+            [(type(n), n.value) for n in node.items[1:]],
+            [(bracex.InvalidBrace, '{'), (bracex.Literal, 'c,d')]
+        )
+        self.assertEqual(list(node), ['{a}{c,d', 'b{c,d'])
+
+    def test_empty(self):
+        """Test that empty slots are counted."""
+
+        node = bracex.parse('{,a,}')
+        self.assertEqual((node.count, node.empty), (3, 2))
+
+    def test_bytes(self):
+        """Test parsing byte strings."""
+
+        node = bracex.parse(b'a{b,c}')
+        self.assertEqual(list(node), [b'ab', b'ac'])
+        self.assertEqual(node.items[0].value, b'a')
+
+    def test_no_limit(self):
+        """Test that parsing does not apply the expansion limit."""
+
+        self.assertEqual(bracex.parse('{1..10}{1..10}{1..10}{1..10}').count, 10000)
+
+    def test_repr(self):
+        """Test node representations."""
+
+        self.assertEqual(
+            repr(bracex.parse('{a,b}{1..3}')),
+            "Sequence((Alternation((Literal('a'), Literal('b'))), IntRange(1, 3, 1, 0)))"
+        )
+
+
+class TestUnique(unittest.TestCase):
+    """Test removing duplicate expansions."""
+
+    def test_exact(self):
+        """Test removing duplicates with a set."""
+
+        self.assertEqual(bracex.expand('{a,b,a}{1,2}', unique=True), ['a1', 'a2', 'b1', 'b2'])
+        self.assertEqual(bracex.expand('{a,{a,b}}{,}', unique=True), ['a', 'b'])
+        self.assertEqual(bracex.expand(b'{a,b,a}', unique=True), [b'a', b'b'])
+        self.assertEqual(bracex.unique_strategy('{a,b,a}'), 'exact')
+
+    def test_filter(self):
+        """Test removing duplicates with a probabilistic filter."""
+
+        expected = list(dict.fromkeys(bracex.expand('{a,b,a}{1..100}', limit=0)))
+        self.assertEqual(bracex.expand('{a,b,a}{1..100}', limit=0, unique=4096), expected)
+        self.assertEqual(bracex.unique_strategy('{a,b,a}', unique=4096), 'filter')
+
+        # A small filter may remove values that are not duplicates, but never keeps a duplicate.
+        values = bracex.expand('{a,b,a}{1..1000}', limit=0, unique=64)
+        self.assertEqual(len(values), len(set(values)))
+
+        with self.assertRaises(ValueError):
+            bracex.expand('{a,a}', unique=0)
+
+    def test_proven(self):
+        """Test patterns that are proven to never expand duplicates."""
+
+        for pattern in (
+            'host{1..100}.{eu,us}', '{web,db}{1..10}', '{1..10}{1..10}', '{x{1..3},y{1..3}}', '{{a..z},{A..Z}}',
+            '{a..c}{{1..9},{10..99}}', 'a{,b}'
+        ):
+            self.assertEqual(bracex.unique_strategy(pattern), 'proven', pattern)
+            self.assertEqual(bracex.unique_strategy(pattern, unique=1024), 'proven', pattern)
+
+        for pattern in ('{a,a}', '{ab,a}{c,bc}', '{,}x', '{a,{a,b}}', '{1..10}{0,}{1..10}'):
+            self.assertNotEqual(bracex.unique_strategy(pattern), 'proven', pattern)
+
+    def test_slice(self):
+        """Test that duplicates are removed from a slice of the expansions."""
+
+        self.assertEqual(bracex.expand('{a,b,a,c}', start=1, unique=True), ['b', 'a', 'c'])
+        self.assertEqual(bracex.compile('{a,b,a,c}').expand(0, 3, unique=True), ['a', 'b'])
+
+    def test_disabled(self):
+        """Test that duplicates are kept by default."""
+
+        self.assertEqual(bracex.expand('{a,a}'), ['a', 'a'])
+        self.assertIsNone(bracex.unique_strategy('{a,a}', unique=False))
+
+
+class TestSort(unittest.TestCase):
+    """Test expanding in sorted order."""
+
+    def assert_sorted(self, pattern, **kwargs):
+        """Assert the sorted expansions are the same as sorting the expansions."""
+
+        self.assertEqual(
+            bracex.expand(pattern, limit=0, sort=True, **kwargs),
+            sorted(bracex.expand(pattern, limit=0, **kwargs)),
+            pattern
+        )
+
+    def test_sort(self):
+        """Test sorting expansions."""
+
+        self.assertEqual(bracex.expand('{b,a}{8..10}', sort=True), ['a10', 'a8', 'a9', 'b10', 'b8', 'b9'])
+        for pattern in (
+            '{1..120}', '{-120..15..7}', '{-05..105..3}', '{z..a..3}', '{ab,a}{c,bc}', '{a,{1..20}}x{,y}',
+            '{,}a{9..11}', '{,a}{,b}', '{Z..a}{1..3}', '{1..10}{1..10}{,x}', '{a,a,b}{b,a}'
+        ):
+            self.assert_sorted(pattern)
+        self.assert_sorted(b'{b,a}{1..20}')
+
+    def test_slice(self):
+        """Test slicing the sorted expansions."""
+
+        self.assertEqual(bracex.expand('{c,b,a}{1..3}', start=2, stop=5, sort=True), ['a3', 'b1', 'b2'])
+        self.assertEqual(bracex.expand('{c,b,a}', shard=(1, 3), sort=True), ['b'])
+
+    def test_slice_huge(self):
+        """Test slicing sorted expansions that are too many to count with a machine sized integer."""
+
+        pattern = bracex.compile('{b,a}' * 64, limit=0)
+        self.assertEqual(next(pattern.iexpand(sort=True)), 'a' * 64)
+        self.assertEqual(pattern.expand(1, 3, sort=True), ['a' * 63 + 'b', 'a' * 62 + 'ba'])
+        self.assertEqual(pattern.expand(shard=(0, 2 ** 64), sort=True), ['a' * 64])
+
+    def test_many_groups(self):
+        """Test sorting patterns with more groups than the recursion limit would allow nesting."""
+
+        self.assertEqual(
+            bracex.expand('x{b,a}' * 400, limit=0, sort=True, stop=2),
+            ['xa' * 400, 'xa' * 399 + 'xb']
+        )
+        self.assertEqual(
+            bracex.expand('{1..9}' * 1000, limit=0, sort=True, stop=2),
+            ['1' * 1000, '1' * 999 + '2']
+        )
+        self.assertEqual(
+            bracex.expand('{ab,a,}' * 300, limit=0, sort=True, stop=3),
+            ['a', 'aa', 'aaa']
+        )
+
+    def test_unique(self):
+        """Test removing duplicates from the sorted expansions."""
+
+        self.assertEqual(bracex.expand('{b,a,b}{,}', sort=True, unique=True), ['a', 'b'])
+        self.assertEqual(bracex.unique_strategy('{b,a,b}', sort=True), 'sorted')
+        self.assertEqual(bracex.unique_strategy('{b,a}', sort=True), 'proven')
+
+    def test_empty(self):
+        """Test sorting patterns without expansions."""
+
+        self.assertEqual(bracex.expand('{,}', sort=True), [])
+        self.assertEqual(bracex.expand('{,}', sort=True, return_empty=True), [''])
+
+    def test_memory(self):
+        """Test that sorted expansions are not held in memory."""
+
+        pattern = bracex.compile('item{1..1000000}.{x,y}', limit=0)
+        tracemalloc.start()
+        try:
+            values = pattern.iexpand(sort=True)
+            self.assertEqual(list(itertools.islice(values, 4)), ['item1.x', 'item1.y', 'item10.x', 'item10.y'])
+            collections.deque(itertools.islice(values, 100000), 0)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 * 1024)
+
+
+class TestStats(unittest.TestCase):
+    """Test pattern statistics."""
+
+    def test_stats(self):
+        """Test the statistics of a pattern."""
+
+        stats = bracex.stats('file-{1..1000}-{a..z}.txt')
+        self.assertEqual(
+            stats,
+            (26000, 361218, 12, 15, 361218 / 26000, 1, 2, 1000)
+        )
+        self.assertEqual(stats.expansions, bracex.count('file-{1..1000}-{a..z}.txt'))
+
+    def test_lengths(self):
+        """Test the lengths of expansions with empty slots and mixed widths."""
+
+        for pattern in ('{,a}{,bc}{1..12}', '{-05..05}', '{Z..a}x', '{a,{1..20}}x{,y}', 'x{a}{b,c'):
+            lengths = [len(v) for v in bracex.expand(pattern, limit=0)]
+            stats = bracex.stats(pattern)
+            self.assertEqual(
+                (stats.expansions, stats.size, stats.min_length, stats.max_length),
+                (len(lengths), sum(lengths), min(lengths), max(lengths)),
+                pattern
+            )
+
+    def test_groups(self):
+        """Test the nesting and number of groups."""
+
+        stats = bracex.stats('{x{a,b},c}{Z..a}{1..100..3}')
+        self.assertEqual((stats.depth, stats.groups, stats.largest_range), (2, 4, 34))
+        stats = bracex.stats('{{a}}')
+        self.assertEqual((stats.depth, stats.groups, stats.largest_range), (0, 0, 0))
+
+    def test_empty(self):
+        """Test the statistics of a pattern without expansions."""
+
+        self.assertEqual(bracex.stats('{,}'), (0, 0, 0, 0, 0.0, 1, 1, 0))
+        self.assertEqual(bracex.stats('{,}', return_empty=True), (1, 0, 0, 0, 0.0, 1, 1, 0))
+
+    def test_large(self):
+        """Test that statistics are calculated without expanding."""
+
+        stats = bracex.stats('{a,bb}' * 40)
+        self.assertEqual((stats.expansions, stats.min_length, stats.max_length), (2 ** 40, 40, 80))
+        self.assertEqual(stats.mean_length, 60.0)
+
+
+class TestCancel(unittest.TestCase):
+    """Test cancelling expansions."""
+
+    def test_timeout(self):
+        """Test that an expansion stops once the timeout passes."""
+
+        with self.assertRaises(bracex.ExpansionTimeoutException) as cm:
+            bracex.expand('{a,b}' * 40, limit=0, timeout=0.05)
+        self.assertGreater(cm.exception.produced, 0)
+        self.assertEqual(cm.exception.produced % bracex.CANCEL_INTERVAL, 0)
+        self.assertIn(f'after {cm.exception.produced:d} expansions', str(cm.exception))
+
+    def test_cancel(self):
+        """Test cancelling an expansion with a token."""
+
+        token = bracex.CancellationToken()
+        values = bracex.iexpand('{a,b}' * 40, limit=0, cancel=token)
+        self.assertEqual(list(itertools.islice(values, 3000)), bracex.compile('{a,b}' * 40, limit=0).expand(0, 3000))
+        self.assertFalse(token.cancelled)
+        token.cancel()
+        self.assertTrue(token.cancelled)
+        with self.assertRaises(bracex.ExpansionCancelledException) as cm:
+            list(values)
+        self.assertNotIsInstance(cm.exception, bracex.ExpansionTimeoutException)
+        self.assertGreaterEqual(cm.exception.produced, 3000)
+
+    def test_cancel_thread(self):
+        """Test cancelling an expansion from another thread."""
+
+        token = bracex.CancellationToken()
+        timer = threading.Timer(0.05, token.cancel)
+        timer.start()
+        try:
+            with self.assertRaises(bracex.ExpansionCancelledException):
+                for _ in bracex.iexpand('{a,b}' * 40, limit=0, cancel=token):
+                    pass
+        finally:
+            timer.cancel()
+
+    def test_parent(self):
+        """Test that a token is cancelled with its parent."""
+
+        parent = bracex.CancellationToken()
+        token = bracex.CancellationToken(timeout=60, parent=parent)
+        parent.cancel()
+        with self.assertRaises(bracex.ExpansionCancelledException):
+            token.check()
+
+    def test_parse(self):
+        """Test cancelling while a pattern is parsed."""
+
+        bracex.purge()
+        token = bracex.CancellationToken()
+        token.cancel()
+        with self.assertRaises(bracex.ExpansionCancelledException) as cm:
+            bracex.compile('{a,b}{c,d}', cancel=token)
+        self.assertEqual(cm.exception.produced, 0)
+        self.assertEqual(bracex.cache_info().currsize, 0)
+
+    def test_complete(self):
+        """Test that expansions that finish in time are not affected."""
+
+        self.assertEqual(bracex.expand('{a,b}{1..3}', timeout=60), ['a1', 'a2', 'a3', 'b1', 'b2', 'b3'])
+        self.assertEqual(
+            bracex.expand('{1..2500}', limit=0, cancel=bracex.CancellationToken()),
+            bracex.expand('{1..2500}', limit=0)
+        )
+
+
+class TestAsync(unittest.TestCase):
+    """Test asynchronous expansion."""
+
+    def collect(self, *args, **kwargs):
+        """Collect the expansions of `aiexpand`."""
+
+        async def run():
+            return [x async for x in bracex.aiexpand(*args, **kwargs)]
+
+        return asyncio.run(run())
+
+    def test_aiexpand(self):
+        """Test that the expansions match `expand`."""
+
+        self.assertEqual(self.collect('{a,b}{1..3}', batch=2), bracex.expand('{a,b}{1..3}'))
+        self.assertEqual(self.collect(b'{a,b}{1..3}', batch=4), bracex.expand(b'{a,b}{1..3}'))
+        self.assertEqual(
+            self.collect('{c,a,b,a}{1..3}', start=2, stop=9, unique=True, sort=True, batch=3),
+            bracex.expand('{c,a,b,a}{1..3}', start=2, stop=9, unique=True, sort=True)
+        )
+        self.assertEqual(self.collect('{1..10}', time_slice=0), bracex.expand('{1..10}'))
+
+    def test_executor(self):
+        """Test expanding batches in an executor."""
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            self.assertEqual(
+                self.collect('{a..z}{1..100}', limit=0, batch=7, executor=executor),
+                bracex.expand('{a..z}{1..100}', limit=0)
+            )
+
+    def test_errors(self):
+        """Test that errors are raised from the generator."""
+
+        with self.assertRaises(bracex.ExpansionLimitException):
+            self.collect('{1..10}{1..10}', limit=10)
+
+        with self.assertRaises(bracex.ExpansionTimeoutException):
+            self.collect('{a,b}' * 40, limit=0, timeout=0)
+
+        with self.assertRaises(ValueError):
+            self.collect('{a,b}', batch=0)
+
+    def test_event_loop_stall(self):
+        """Test that a large expansion does not stall other tasks."""
+
+        async def heartbeat(stop, stalls):
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                stalls.append(now - last)
+                last = now
+
+        async def run():
+            stop = asyncio.Event()
+            stalls = []
+            task = asyncio.ensure_future(heartbeat(stop, stalls))
+            await asyncio.sleep(0)
+            total = 0
+            async for _ in bracex.aiexpand('{1..10000}{1..1000}', limit=0):
+                total += 1
+                if total == 300000:
+                    break
+            stop.set()
+            await task
+            return total, stalls
+
+        total, stalls = asyncio.run(run())
+        self.assertEqual(total, 300000)
+        self.assertGreater(len(stalls), 250)
+        self.assertLess(max(stalls), 0.1)
@@ -1,5 +1,7 @@
 """Test command module and argument handling."""
+import io
 import pytest
+import bracex
 from bracex.__main__ import main
 from bracex import __version__
 
@@ -93,3 +95,87 @@ def test_excess_args_is_considered_an_error(capsys):
     assert capture.out == ""
     assert capture.err.find("error: unrecognized arguments") > 0
     assert exinfo.value.code > 0
+
+
+def test_expand_slice(capsys):
+    """Test that a slice of the expansions can be output."""
+    with pytest.raises(SystemExit) as exinfo:
+        main(['--start', '1', '--stop=-1', '{a..e}'])
+    capture = capsys.readouterr()
+    assert capture.out == "b\nc\nd\n"
+    assert exinfo.value.code == 0
+
+
+def test_expand_shard(capsys):
+    """Test that a shard of the expansions can be output."""
+    with pytest.raises(SystemExit) as exinfo:
+        main(['--shard', '1', '3', '{1..9}'])
+    capture = capsys.readouterr()
+    assert capture.out == "4\n5\n6\n"
+    assert exinfo.value.code == 0
+
+
+def test_invalid_shard_is_considered_an_error(capsys):
+    """Test that an error is reported for a shard that does not exist."""
+    with pytest.raises(SystemExit) as exinfo:
+        main(['--shard', '3', '3', '{1..9}'])
+    capture = capsys.readouterr()
+    assert capture.out == ""
+    assert capture.err.find("error: argument --shard") > 0
+    assert exinfo.value.code > 0
+
+
+def test_expand_from_file(capsys, tmp_path):
+    """Test that each line of a file is expanded."""
+    path = tmp_path / 'patterns.txt'
+    path.write_text('{a,b}\n\nx{1..2}\n', encoding='utf-8')
+    with pytest.raises(SystemExit) as exinfo:
+        main(['--from-file', str(path)])
+    capture = capsys.readouterr()
+    assert capture.out == "a\nb\nx1\nx2\n"
+    assert exinfo.value.code == 0
+
+
+def test_expand_from_stdin_with_line_numbers(capsys, monkeypatch):
+    """Test that lines are read from stdin and expansions can be prefixed by their line number."""
+    monkeypatch.setattr('sys.stdin', io.StringIO('{a,b}\n\nx{1..3}'))
+    with pytest.raises(SystemExit) as exinfo:
+        main(['-n', '--start', '1', '-f', '-'])
+    capture = capsys.readouterr()
+    assert capture.out == "1:b\n3:x2\n3:x3\n"
+    assert exinfo.value.code == 0
+
+
+def test_expand_from_file_in_parallel(capsys, tmp_path):
+    """Test that lines expanded across workers are output in order."""
+    lines = [f'{{a,b}}{i:d}{{1..3}}' for i in range(250)]
+    path = tmp_path / 'patterns.txt'
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    with pytest.raises(SystemExit) as exinfo:
+        main(['-j', '2', '-t', ' ', '--from-file', str(path)])
+    capture = capsys.readouterr()
+    assert capture.out == ''.join(x + ' ' for line in lines for x in bracex.expand(line))
+    assert exinfo.value.code == 0
+
+
+def test_invalid_jobs_are_considered_an_error(capsys):
+    """Test that an error is reported for invalid job counts."""
+    with pytest.raises(SystemExit) as exinfo:
+        main(['-j', '0', '-f', '-'])
+    assert capsys.readouterr().err.find("error: argument --jobs/-j") > 0
+    assert exinfo.value.code > 0
+
+    with pytest.raises(SystemExit) as exinfo:
+        main(['-j', '2', '{a,b}'])
+    assert capsys.readouterr().err.find("error: argument --jobs/-j") > 0
+    assert exinfo.value.code > 0
+
+
+def test_expression_and_file_are_mutually_exclusive(capsys):
+    """Test that an expression and a file cannot both be given."""
+    with pytest.raises(SystemExit) as exinfo:
+        main(['-f', '-', '{a,b}'])
+    capture = capsys.readouterr()
+    assert capture.out == ""
+    assert capture.err.find("not allowed with argument") > 0
+    assert exinfo.value.code > 0